@@ -0,0 +1,152 @@
+"""Compare copying with shutil and waydroid_injector.clone.
+
+Useful if you want to know how much faster installing is on your filesystem.
+
+Usage:
+    bench-copy.py \
+        --workdir=/path/to/workdir \
+        --files=256 \
+        --size=4194304 \
+        --rounds=3
+
+Remarks:
+    This script use inline script metadata (PEP723) to define dependencies.
+    waydroid_injector is imported from the repository, so no need to install it.
+    Put workdir on the filesystem you want to test, like /var/lib/waydroid.
+    Files are created in a temporary folder under workdir, only it is removed.
+"""
+
+# /// script
+# requires-python = ">=3.12"
+# dependencies = []
+# ///
+
+# pyright: reportAny=false
+
+import sys
+from os import urandom
+from time import perf_counter
+from shutil import copy2
+from shutil import rmtree
+from shutil import copytree
+from logging import StreamHandler
+from logging import getLogger
+from pathlib import Path
+from argparse import Namespace
+from argparse import ArgumentParser
+from tempfile import mkdtemp
+from collections.abc import Callable
+
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from waydroid_injector.clone import clone_file
+from waydroid_injector.clone import clone_tree
+
+
+__version__ = "0.1.0"
+
+
+def _parse_arg(args: list[str] | None = None) -> Namespace:
+    root = ArgumentParser()
+    _ = root.add_argument("-v", "--version", action="version", version=__version__)
+    _ = root.add_argument(
+        "-w",
+        "--workdir",
+        type=Path,
+        required=True,
+        help="Where to create a temporary folder of files to copy.",
+    )
+    _ = root.add_argument(
+        "-f",
+        "--files",
+        type=int,
+        default=256,
+        help="How many files are in the tree.",
+    )
+    _ = root.add_argument(
+        "-s",
+        "--size",
+        type=int,
+        default=4 * 1024 * 1024,
+        help="The size of each file in bytes.",
+    )
+    _ = root.add_argument(
+        "-r",
+        "--rounds",
+        type=int,
+        default=3,
+        help="How many times each way is run, the best one is reported.",
+    )
+    return root.parse_args(args)
+
+
+def _prepare(src: Path, files: int, size: int):
+    for i in range(files):
+        p = src / "{:02x}".format(i % 16) / "{}.so".format(i)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        _ = p.write_bytes(urandom(size))
+    sparse = src / "sparse.img"
+    with sparse.open("wb") as writer:
+        _ = writer.seek(files * size)
+        _ = writer.write(urandom(size))
+
+
+def _measure(rounds: int, dst: Path, func: Callable[[Path], None]) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        _remove(dst)
+        started = perf_counter()
+        func(dst)
+        best = min(best, perf_counter() - started)
+    _remove(dst)
+    return best
+
+
+def _remove(p: Path):
+    if p.is_dir():
+        rmtree(p)
+    else:
+        p.unlink(missing_ok=True)
+
+
+def _main():
+    logger = getLogger(__name__)
+    logger.addHandler(StreamHandler())
+    logger.setLevel("INFO")
+    args = _parse_arg()
+    files: int = args.files
+    size: int = args.size
+    rounds: int = args.rounds
+
+    tmpdir = Path(mkdtemp(prefix="bench-copy.", dir=args.workdir))
+    src = tmpdir / "src"
+    dst = tmpdir / "dst"
+    sparse = src / "sparse.img"
+
+    def shutil_copytree(d: Path):
+        _ = copytree(src, d)
+
+    def shutil_copy2(d: Path):
+        _ = copy2(sparse, d)
+
+    def clone_sparse(d: Path):
+        _ = clone_file(sparse, d)
+
+    try:
+        logger.info("Creating %d files of %d bytes in %s...", files, size, src)
+        _prepare(src, files, size)
+        ways: dict[str, Callable[[Path], None]] = {
+            "shutil.copytree": shutil_copytree,
+            "clone_tree": lambda d: clone_tree(src, d),
+            "shutil.copy2 (sparse)": shutil_copy2,
+            "clone_file (sparse)": clone_sparse,
+        }
+        for name, func in ways.items():
+            logger.info("%-24s %.3fs", name, _measure(rounds, dst, func))
+    finally:
+        rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,93 @@
+"""Measure memory and time used to load manifests.
+
+Useful if you want to know how much memory large manifests take,
+like when many of them are planned at once.
+
+Usage:
+    bench-memory.py \
+        --copies=100 \
+        manifests/*.toml
+
+Remarks:
+    This script use inline script metadata (PEP723) to define dependencies.
+    waydroid_injector is imported from the repository, so no need to install it.
+    Run it on different commits to compare them.
+"""
+
+# /// script
+# requires-python = ">=3.12"
+# dependencies = []
+# ///
+
+# pyright: reportAny=false
+
+import sys
+import tracemalloc
+from time import perf_counter
+from typing import Any
+from logging import StreamHandler
+from logging import getLogger
+from pathlib import Path
+from tomllib import loads
+from argparse import Namespace
+from argparse import ArgumentParser
+
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from waydroid_injector.manifest import Manifest
+
+
+__version__ = "0.1.0"
+
+
+def _parse_arg(args: list[str] | None = None) -> Namespace:
+    root = ArgumentParser()
+    _ = root.add_argument("-v", "--version", action="version", version=__version__)
+    _ = root.add_argument(
+        "-c",
+        "--copies",
+        type=int,
+        default=100,
+        help="How many times each manifest is loaded and kept alive.",
+    )
+    _ = root.add_argument(
+        "manifests",
+        type=Path,
+        nargs="*",
+        default=sorted((Path(__file__).parent.parent / "manifests").glob("*.toml")),
+        help="Manifests to load, defaults to the bundled ones.",
+    )
+    return root.parse_args(args)
+
+
+def _main():
+    logger = getLogger(__name__)
+    logger.addHandler(StreamHandler())
+    logger.setLevel("INFO")
+    args = _parse_arg()
+    copies: int = args.copies
+    paths: list[Path] = args.manifests
+
+    data: list[dict[str, Any]] = [loads(path.read_text()) for path in paths]
+    contents = sum(len(i.get("contents", [])) for i in data) * copies
+    logger.info("Loading %d manifests %d times...", len(data), copies)
+
+    tracemalloc.start()
+    started = perf_counter()
+    manifests = [Manifest.load(i) for _ in range(copies) for i in data]
+    elapsed = perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    logger.info("%-24s %d", "manifests", len(manifests))
+    logger.info("%-24s %d", "contents", contents)
+    logger.info("%-24s %.3fs", "time", elapsed)
+    logger.info("%-24s %d bytes", "current", current)
+    logger.info("%-24s %d bytes", "peak", peak)
+    if contents > 0:
+        logger.info("%-24s %.1f bytes", "per content", current / contents)
+
+
+if __name__ == "__main__":
+    _main()
@@ -10,6 +10,8 @@ Usage:
         --srcdir=/path/to/srcdir
 
 Remarks:
+    Consider a content with type = "tree" instead, which mirrors srcdir
+    when installing and keeps manifest short.
     This script use inline script metadata (PEP723) to define dependencies.
     Use any package manager supports PEP723 to run this script
 can make your life easier.
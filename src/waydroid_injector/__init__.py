@@ -2,6 +2,7 @@
 
 # pyright: reportAny=false
 
+from sys import stdout
 from types import UnionType
 from typing import Any
 from typing import TypeGuard
@@ -18,12 +19,17 @@ from pathlib import Path
 from tomllib import loads
 from argparse import Namespace
 from argparse import ArgumentParser
+from datetime import datetime
 from collections.abc import Sequence
+from waydroid_injector.cache import Cache
+from waydroid_injector.version import __version__
+from waydroid_injector.compiled import CompiledCache
 from waydroid_injector.manifest import Manifest
+from waydroid_injector.type_defines import SkipMode
 from waydroid_injector.type_defines import EntrypointFunctionType
 
 
-__version__ = "0.2.1"
+_MIB = 1024 * 1024
 
 
 def _type_accepted(i: Any, *ts: type | None) -> bool:  # noqa: ANN401
@@ -75,6 +81,32 @@ def parse_args(args: Sequence[str] | None = None) -> Namespace:
         help="enable debug mode.",
     )
     _ = root.add_argument("-s", "--destdir", type=Path, help="destination to rootfs.")
+    _ = root.add_argument(
+        "--cache-dir",
+        type=Path,
+        help="where sources are cached, defaults to /var/cache/waydroid-injector.",
+    )
+    _ = root.add_argument(
+        "--cache-max-size",
+        type=int,
+        default=Cache.DEFAULT_MAX_SIZE // _MIB,
+        help="maximum size of cache in MiB.",
+    )
+    _ = root.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="do not use cache when obtaining sources.",
+    )
+    _ = root.add_argument(
+        "--no-compiled-cache",
+        action="store_true",
+        help="parse the manifest instead of using the one compiled last time.",
+    )
+    _ = root.add_argument(
+        "--stream",
+        action="store_true",
+        help="check contents one by one while installing, implies --no-compiled-cache.",
+    )
     operations = root.add_subparsers(
         title="operations",
         description="available operations:",
@@ -86,15 +118,111 @@ def parse_args(args: Sequence[str] | None = None) -> Namespace:
         help="Install the manifest into waydroid's data.",
     )
     _ = install.add_argument("manifest", type=Path, help="the path to the manifest.")
+    _ = install.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="how many sources are prepared and contents are created at once.",
+    )
+    _ = install.add_argument(
+        "--rehash",
+        action="store_true",
+        help="hash all sources instead of trusting unchanged files.",
+    )
+    _ = install.add_argument(
+        "--skip-unchanged",
+        choices=get_args(SkipMode.__value__),
+        help="skip writing files matching the source, only repairing mode and xattr.",
+    )
     uninstall = operations.add_parser(
         "uninstall",
         help="Uninstall the manifest from waydroid's data.",
     )
     _ = uninstall.add_argument("manifest", type=Path, help="the path to the manifest.")
+    validate = operations.add_parser(
+        "validate",
+        help="Find problems of the manifest without installing it.",
+    )
+    _ = validate.add_argument("manifest", type=Path, help="the path to the manifest.")
+    cache = operations.add_parser("cache", help="Manage cache of sources.")
+    cache_operations = cache.add_subparsers(
+        title="cache operations",
+        description="available cache operations:",
+        required=True,
+        dest="cache_operation",
+    )
+    _ = cache_operations.add_parser("list", help="List sources in cache.")
+    prune = cache_operations.add_parser(
+        "prune",
+        help="Evict least recently used sources from cache.",
+    )
+    _ = prune.add_argument(
+        "--max-size",
+        type=int,
+        help="size in MiB to fit, defaults to --cache-max-size.",
+    )
 
     return root.parse_args(args)
 
 
+def _get_cache(args: Namespace) -> Cache:
+    """Get the cache described in arguments."""
+    root: Path = args.cache_dir or Cache.default_root(
+        Path("slash") if args.dry_run else Path("/"),
+    )
+    return Cache(root, args.cache_max_size * _MIB)
+
+
+def _load_manifest(args: Namespace) -> Manifest:
+    """Load the manifest described in arguments."""
+    path: Path = args.manifest
+    if args.stream:
+        return Manifest.stream(loads(path.read_text()))
+    # Validating must report problems of the manifest text itself.
+    if args.no_compiled_cache or args.operation == "validate":
+        return Manifest.load(loads(path.read_text()))
+    slash: Path = Path("slash") if args.dry_run else args.destdir or Path("/")
+    cache = CompiledCache(CompiledCache.default_root(slash / "var/lib/waydroid"))
+    return cache.load(path)
+
+
+def _operation_options(args: Namespace) -> dict[str, Any]:
+    """Get options which are only accepted by the operation chosen."""
+    match args.operation:
+        case "install":
+            return {
+                "jobs": args.jobs,
+                "cache": None if args.no_cache else _get_cache(args),
+                "rehash": args.rehash,
+                "skip_unchanged": args.skip_unchanged,
+            }
+        case _:
+            return {}
+
+
+def _manage_cache(args: Namespace):
+    """Run the cache operation chosen."""
+    logger = getLogger(__name__)
+    cache = _get_cache(args)
+    match args.cache_operation:
+        case "list":
+            for entry in cache.entries():
+                last_used = datetime.fromtimestamp(entry.last_used)
+                _ = stdout.write(
+                    "{} {:>12} {}\n".format(
+                        entry.sha256,
+                        entry.size,
+                        last_used.isoformat(" ", "seconds"),
+                    ),
+                )
+        case "prune":
+            max_size: int | None = args.max_size
+            for entry in cache.prune(max_size * _MIB if max_size is not None else None):
+                logger.info("Evicted %s (%d bytes).", entry.sha256, entry.size)
+        case _:
+            raise ValueError("No such cache operation {}".format(args.cache_operation))
+
+
 def setup_logger(logger: Logger, debug: bool):
     """Setup the logger."""
     logger.setLevel(DEBUG if debug else INFO)
@@ -113,11 +241,21 @@ def main():
     """Main entrance of waydroid_injector."""
     args = parse_args()
     setup_logger(getLogger(__name__), args.debug)
-    data = loads(args.manifest.read_text())
-    manifest = Manifest.load(data)
+    if args.operation == "cache":
+        _manage_cache(args)
+        return
+    manifest = _load_manifest(args)
+    if args.operation == "validate":
+        problems = manifest.check()
+        getLogger(__name__).info("Found %d warnings and no error.", len(problems))
+        return
     if not manifest.valid:
         raise ValueError("Manifest is not valid.")
     func = getattr(manifest, args.operation)
     if not is_entrypoint(func):
         raise ValueError("No such operation {}".format(args.operation))
-    func(args.dry_run, Path("slash") if args.dry_run else args.destdir)
+    func(
+        args.dry_run,
+        Path("slash") if args.dry_run else args.destdir,
+        **_operation_options(args),
+    )
@@ -8,26 +8,31 @@ from logging import getLogger
 from pathlib import Path
 from subprocess import run
 from dataclasses import field
+from dataclasses import asdict
 from dataclasses import dataclass
+from waydroid_injector.extract import Extract
 from waydroid_injector.deserializable import Deserializable
 
 
 @final
-@dataclass
+@dataclass(slots=True)
 class Build(Deserializable):
     """Class to describe how to build the source.
 
     Attributes:
         cmd(list[str]): The command in list to be run, like ["ls", "-l"].
         shell(str | None): A shell script to be run. Defaults to None.
+        extract(Extract | None): How to extract the source before running
+        cmd or shell. Defaults to None.
 
     Remarks:
-        Must ensure cmd is not empty or shell is not None.
+        Must ensure cmd is not empty, shell is not None or extract is not None.
         Or nothing will happen when calls build() function.
     """
 
     cmd: list[str] = field(default_factory=list)
     shell: str | None = None
+    extract: Extract | None = None
 
     def build(self, srcdir: Path, file_name: str):
         """Build the source.
@@ -46,26 +51,62 @@ class Build(Deserializable):
             "/usr/local/sbin",
         ]
         env = {"PATH": ":".join(default_path)}
-        if len(self.cmd) > 0:
-            cmd = [i.format(srcdir=srcdir, file_name=file_name) for i in self.cmd]
+        if self.extract is not None:
+            logger.debug("Extracting %s...", file_name)
+            self.extract.extract(srcdir / file_name, srcdir)
+        cmd, shell = self.__expand(srcdir, file_name)
+        if len(cmd) > 0:
             logger.debug("Invoking command %s", cmd)
             _ = run(cmd, cwd=srcdir, check=True, env=env)  # noqa: S603
-        elif self.shell is not None:
-            shell = self.shell.format(srcdir=srcdir, file_name=file_name)
+        elif shell is not None:
             logger.debug("Running script in shell...")
             logger.debug("Script: %s", shell)
             _ = run(shell, shell=True, check=True, env=env)  # noqa: S602
 
+    def fingerprint(self, srcdir: Path, file_name: str) -> dict[str, object]:
+        """Get what decides the result of build(), with variables expanded.
+
+        Args:
+            srcdir(Path): Where the source contents are storaged.
+            file_name(str): The file-name value in manifest.
+        """
+        cmd, shell = self.__expand(srcdir, file_name)
+        return {
+            "cmd": cmd,
+            "shell": shell,
+            "extract": asdict(self.extract) if self.extract is not None else None,
+        }
+
+    def __expand(self, srcdir: Path, file_name: str) -> tuple[list[str], str | None]:
+        cmd = [i.format(srcdir=srcdir, file_name=file_name) for i in self.cmd]
+        shell = (
+            self.shell.format(srcdir=srcdir, file_name=file_name)
+            if self.shell is not None
+            else None
+        )
+        return cmd, shell
+
     @property
     @override
     def valid(self) -> bool:
         has_cmd = len(self.cmd) > 0
         has_shell = self.shell is not None
-        return any([has_cmd, has_shell])
+        has_extract = self.extract is not None
+        return any([has_cmd, has_shell, has_extract])
 
     @classmethod
     @override
     def load(cls, data: dict[str, Any]) -> Self:
         cmd: list[str] | None = data.get("cmd")
         shell: str | None = data.get("shell")
-        return cls(cmd or [], shell)
+        extract_data: bool | dict[str, Any] = data.get("extract", False)
+        extract = (
+            Extract.load(extract_data)
+            if isinstance(extract_data, dict)
+            else Extract()
+            if extract_data
+            else None
+        )
+        if extract is not None and not extract.valid:
+            raise ValueError("Build.extract is not valid.")
+        return cls(cmd or [], shell, extract)
@@ -0,0 +1,152 @@
+"""Share obtained sources between manifests."""
+
+from os import utime
+from time import time_ns
+from uuid import uuid4
+from typing import ClassVar
+from typing import final
+from logging import getLogger
+from pathlib import Path
+from dataclasses import dataclass
+from waydroid_injector.clone import clone_file
+
+
+@final
+@dataclass
+class CacheEntry:
+    """Class to describe a source stored in cache.
+
+    Attributes:
+        sha256(str): The sha256 checksum of the source.
+        size(int): The size of the source in bytes.
+        last_used(float): When the source is used last time.
+    """
+
+    sha256: str
+    size: int
+    last_used: float
+
+
+@final
+@dataclass
+class Cache:
+    """Class to describe a content-addressed cache of sources.
+
+    Attributes:
+        root(Path): Where the cached sources are storaged.
+        Each source is saved as {root}/{sha256}.
+
+        max_size(int | None): The maximum size of cache in bytes.
+        Least recently used sources are evicted when exceeded.
+        None means no limit.
+
+    Remarks:
+        Last used time is tracked with atime, which is updated explicitly
+        so it works on filesystems mounted with noatime. mtime is left as is
+        because sources may be hardlinked to the cache entries.
+    """
+
+    DEFAULT_MAX_SIZE: ClassVar[int] = 4 * 1024 * 1024 * 1024
+
+    root: Path
+    max_size: int | None = DEFAULT_MAX_SIZE
+
+    @classmethod
+    def default_root(cls, slash: Path) -> Path:
+        """Get the default cache root under slash."""
+        return slash / "var/cache/waydroid-injector"
+
+    def get(self, sha256: str, dst: Path, allow_hardlink: bool = False) -> bool:
+        """Place cached source with sha256 at dst.
+
+        Args:
+            sha256(str): The sha256 of source.
+            dst(Path): Where to place the source.
+            allow_hardlink(bool): If dst is guaranteed to be used read-only,
+            so it can share inode with the cache entry.
+
+        Returns:
+            bool: If the source is found in cache.
+        """
+        logger = getLogger(__name__)
+        entry = self.root / sha256
+        if not entry.is_file():
+            return False
+        try:
+            dst.unlink(missing_ok=True)
+            _ = clone_file(entry, dst, allow_hardlink)
+            self.__touch(entry)
+        except OSError:
+            logger.warning("Failed to get %s from cache.", sha256, exc_info=True)
+            return False
+        logger.info("Found %s in cache.", sha256)
+        return True
+
+    def put(self, sha256: str, src: Path, allow_hardlink: bool = False):
+        """Store src into cache as sha256.
+
+        Cache is pruned to max_size after storing.
+
+        Args:
+            sha256(str): The sha256 of src.
+            src(Path): The source to store.
+            allow_hardlink(bool): If src is guaranteed to be used read-only,
+            so the cache entry can share inode with it.
+        """
+        logger = getLogger(__name__)
+        entry = self.root / sha256
+        tmp = self.root / ".{}.{}".format(sha256, uuid4().hex)
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            _ = clone_file(src, tmp, allow_hardlink)
+            _ = tmp.replace(entry)
+            self.__touch(entry)
+        except OSError:
+            logger.warning("Failed to store %s into cache.", sha256, exc_info=True)
+            tmp.unlink(missing_ok=True)
+            return
+        logger.debug("Stored %s into cache.", sha256)
+        _ = self.prune()
+
+    def remove(self, sha256: str):
+        """Remove source with sha256 from cache."""
+        getLogger(__name__).debug("Removing %s from cache...", sha256)
+        (self.root / sha256).unlink(missing_ok=True)
+
+    def entries(self) -> list[CacheEntry]:
+        """Get sources in cache, most recently used first."""
+        if not self.root.is_dir():
+            return []
+        entries: list[CacheEntry] = []
+        for p in self.root.iterdir():
+            if p.name.startswith(".") or not p.is_file():
+                continue
+            st = p.stat()
+            entries.append(CacheEntry(p.name, st.st_size, st.st_atime))
+        entries.sort(key=lambda entry: entry.last_used, reverse=True)
+        return entries
+
+    def prune(self, max_size: int | None = None) -> list[CacheEntry]:
+        """Evict least recently used sources until cache fits max_size.
+
+        Args:
+            max_size(int | None): The size to fit. Use self.max_size if is None.
+
+        Returns:
+            list[CacheEntry]: Entries evicted.
+        """
+        limit = max_size if max_size is not None else self.max_size
+        if limit is None:
+            return []
+        entries = self.entries()
+        total = sum(entry.size for entry in entries)
+        evicted: list[CacheEntry] = []
+        while total > limit and len(entries) > 0:
+            entry = entries.pop()
+            self.remove(entry.sha256)
+            total -= entry.size
+            evicted.append(entry)
+        return evicted
+
+    def __touch(self, entry: Path):
+        utime(entry, ns=(time_ns(), entry.stat().st_mtime_ns))
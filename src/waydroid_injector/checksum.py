@@ -1,37 +1,151 @@
 """Check if source is valid."""
 
+from io import BufferedIOBase
+from os import fstat
 from typing import Any
 from typing import Self
+from typing import ClassVar
 from typing import final
 from typing import override
-from hashlib import sha256
+from hashlib import new
+from logging import getLogger
+from pathlib import Path
 from dataclasses import dataclass
+from collections.abc import Mapping
+from waydroid_injector.memo import DigestMemo
 from waydroid_injector.deserializable import Deserializable
 
 
 @final
-@dataclass
+@dataclass(slots=True)
 class Checksum(Deserializable):
     """Class to describe how to check the source.
 
     Attributes:
         sha256(str | None): The sha256 checksum.
+        sha512(str | None): The sha512 checksum.
+        blake2b(str | None): The blake2b checksum.
+        sha1(str | None): The sha1 checksum, for upstream compatibility only.
+        md5(str | None): The md5 checksum, for upstream compatibility only.
+
+    Remarks:
+        All checksums set are computed in a single pass of data.
     """
 
     sha256: str | None = None
+    sha512: str | None = None
+    blake2b: str | None = None
+    sha1: str | None = None
+    md5: str | None = None
+
+    @property
+    def digests(self) -> dict[str, str]:
+        """Checksums which are set, keyed by algorithm name in hashlib."""
+        digests = {
+            "sha256": self.sha256,
+            "sha512": self.sha512,
+            "blake2b": self.blake2b,
+            "sha1": self.sha1,
+            "md5": self.md5,
+        }
+        return {key: value for key, value in digests.items() if value is not None}
+
+    def match(self, digests: Mapping[str, str]) -> bool:
+        """Check if digests match the checksums."""
+        return all(
+            digests.get(key) == value.lower() for key, value in self.digests.items()
+        )
 
     def check(self, content: bytes) -> bool:
         """Check if the content match the checksums."""
-        sha256_match = self.sha256 is None or sha256(content).hexdigest() == self.sha256
-        return all([sha256_match])
+        hasher = self.hasher()
+        hasher.update(content)
+        return hasher.match
+
+    def check_file(self, path: Path, memo: DigestMemo | None = None) -> bool:
+        """Check if the file at path match the checksums.
+
+        The file is read in chunks so it never sits in memory as a whole.
+
+        Args:
+            path(Path): The file to check.
+            memo(DigestMemo | None): Where to find and remember digests.
+            The file is not read if its stat is unchanged since last check.
+        """
+        hasher = self.hasher()
+        with path.open("rb") as reader:
+            st = fstat(reader.fileno())
+            digests = memo.lookup(st) if memo is not None else None
+            if digests is not None and digests.keys() >= self.digests.keys():
+                getLogger(__name__).debug("Using remembered digests of %s", path)
+                return self.match(digests)
+            _ = hasher.update_from(reader)
+        if memo is not None:
+            memo.store(st, hasher.hexdigests)
+        return hasher.match
+
+    def hasher(self) -> "Hasher":
+        """Create a Hasher to check content which is fed incrementally."""
+        return Hasher(self)
 
     @property
     @override
     def valid(self) -> bool:
-        return any(i is not None for i in [self.sha256])
+        return len(self.digests) > 0
 
     @classmethod
     @override
     def load(cls, data: dict[str, Any]) -> Self:
         sha256_: str | None = data.get("sha256")
-        return cls(sha256_)
+        sha512_: str | None = data.get("sha512")
+        blake2b_: str | None = data.get("blake2b")
+        sha1_: str | None = data.get("sha1")
+        md5_: str | None = data.get("md5")
+        return cls(sha256_, sha512_, blake2b_, sha1_, md5_)
+
+
+@final
+class Hasher:
+    """Compute checksums incrementally and compare them with a Checksum.
+
+    Remarks:
+        Use Checksum.hasher() to create instance.
+    """
+
+    CHUNK_SIZE: ClassVar[int] = 1024 * 1024
+
+    def __init__(self, checksum: Checksum):
+        """Initialize the hasher for checksum."""
+        self.__checksum = checksum
+        self.__hashes = {
+            key: new(key, usedforsecurity=False) for key in checksum.digests
+        }
+
+    def update(self, data: bytes | bytearray | memoryview):
+        """Feed data into the hasher."""
+        for hash_ in self.__hashes.values():
+            hash_.update(data)
+
+    def update_from(self, reader: BufferedIOBase) -> int:
+        """Feed all data left in reader into the hasher.
+
+        Returns:
+            int: How many bytes are read.
+        """
+        buffer = bytearray(self.CHUNK_SIZE)
+        view = memoryview(buffer)
+        total = 0
+        while (size := reader.readinto(view)) > 0:
+            self.update(view[:size])
+            total += size
+        return total
+
+    @property
+    def hexdigests(self) -> dict[str, str]:
+        """Digests of data fed, keyed by algorithm name in hashlib."""
+        return {key: hash_.hexdigest() for key, hash_ in self.__hashes.items()}
+
+    @property
+    def match(self) -> bool:
+        """If data fed match the checksums."""
+        return self.__checksum.match(self.hexdigests)
@@ -0,0 +1,181 @@
+"""Place copies of files with the cheapest way available."""
+
+from os import SEEK_DATA
+from os import SEEK_HOLE
+from os import link
+from os import fstat
+from os import lseek
+from os import scandir
+from os import sendfile
+from os import ftruncate
+from os import copy_file_range
+from errno import EIO
+from errno import ENXIO
+from fcntl import ioctl
+from shutil import copystat
+from shutil import copyfileobj
+from logging import getLogger
+from pathlib import Path
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from waydroid_injector.type_defines import CloneStrategy
+
+
+# FICLONE defined in linux/fs.h
+_FICLONE = 0x40049409
+_CHUNK_SIZE = 1024 * 1024 * 1024
+# st_blocks is counted in 512-byte units
+_BLOCK_SIZE = 512
+
+
+def clone_file(src: Path, dst: Path, allow_hardlink: bool = False) -> CloneStrategy:
+    """Place a copy of src at dst, like shutil.copy2 does.
+
+    Strategies are tried in order:
+        reflink: Share extents with src, no data is copied.
+        hardlink: Share inode with src, only when allow_hardlink is True
+        and src is on the same filesystem as dst.
+        sparse: Copy data in kernel, skipping holes, only when src is sparse.
+        copy_file_range: Copy data in kernel.
+        sendfile: Copy data in kernel, for kernels rejecting copy_file_range.
+        copy: Copy data in userspace.
+
+    Args:
+        src(Path): The file to copy.
+        dst(Path): Where to place the copy. It is replaced if exists.
+        allow_hardlink(bool): If dst is guaranteed to be used read-only,
+        as modifying dst modifies src too when hardlinked.
+
+    Returns:
+        CloneStrategy: The strategy used.
+    """
+    logger = getLogger(__name__)
+    dst.unlink(missing_ok=True)
+    strategy = _clone(src, dst, allow_hardlink)
+    if strategy != "hardlink":
+        copystat(src, dst)
+    logger.debug("Placed %s at %s with %s", src, dst, strategy)
+    return strategy
+
+
+def clone_tree(src: Path, dst: Path, jobs: int | None = None):
+    """Place a copy of directory src at dst, like shutil.copytree does.
+
+    Symbolic links in src are followed, and existing files in dst are replaced.
+    Directories are created first, then files are placed with clone_file
+    in a worker pool, and stat of directories are copied at last.
+
+    Args:
+        src(Path): The directory to copy.
+        dst(Path): Where to place the copy. It is merged if exists.
+        jobs(int | None): How many files are placed at once.
+        Use the default of ThreadPoolExecutor if is None.
+    """
+    logger = getLogger(__name__)
+    directories: list[tuple[Path, Path]] = []
+    files: list[tuple[Path, Path]] = []
+    pending = [(src, dst)]
+    while len(pending) > 0:
+        src_dir, dst_dir = pending.pop()
+        dst_dir.mkdir(parents=True, exist_ok=True)
+        directories.append((src_dir, dst_dir))
+        with scandir(src_dir) as it:
+            for entry in it:
+                pair = (Path(entry.path), dst_dir / entry.name)
+                if entry.is_dir():
+                    pending.append(pair)
+                else:
+                    files.append(pair)
+    with ThreadPoolExecutor(jobs, "clone") as executor:
+        for future in [executor.submit(clone_file, *pair) for pair in files]:
+            _ = future.result()
+    for src_dir, dst_dir in reversed(directories):
+        copystat(src_dir, dst_dir)
+    logger.debug("Placed %d files of %s at %s", len(files), src, dst)
+
+
+def _clone(src: Path, dst: Path, allow_hardlink: bool) -> CloneStrategy:
+    if _reflink(src, dst):
+        return "reflink"
+    if allow_hardlink and src.stat().st_dev == dst.parent.stat().st_dev:
+        dst.unlink(missing_ok=True)
+        try:
+            link(src, dst)
+        except OSError:
+            pass
+        else:
+            return "hardlink"
+    with src.open("rb") as reader, dst.open("wb") as writer:
+        st = fstat(reader.fileno())
+        for strategy, copy in _COPIERS:
+            if strategy == "sparse" and st.st_blocks * _BLOCK_SIZE >= st.st_size:
+                continue
+            try:
+                copy(reader.fileno(), writer.fileno(), st.st_size)
+            except OSError:
+                _ = reader.seek(0)
+                _ = writer.seek(0)
+                _ = writer.truncate()
+            else:
+                return strategy
+        copyfileobj(reader, writer)
+    return "copy"
+
+
+def _copy_sparse(reader: int, writer: int, size: int):
+    """Copy data only, so holes in reader are kept as holes in writer."""
+    offset = 0
+    while offset < size:
+        try:
+            data = lseek(reader, offset, SEEK_DATA)
+        except OSError as e:
+            if e.errno == ENXIO:
+                break
+            raise
+        hole = lseek(reader, data, SEEK_HOLE)
+        while data < hole:
+            copied = copy_file_range(reader, writer, hole - data, data, data)
+            if copied == 0:
+                raise _short_copy(data, size)
+            data += copied
+        offset = hole
+    ftruncate(writer, size)
+
+
+def _copy_file_range(reader: int, writer: int, size: int):
+    offset = 0
+    while offset < size:
+        copied = copy_file_range(reader, writer, _CHUNK_SIZE)
+        if copied == 0:
+            raise _short_copy(offset, size)
+        offset += copied
+
+
+def _sendfile(reader: int, writer: int, size: int):
+    offset = 0
+    while offset < size:
+        sent = sendfile(writer, reader, offset, _CHUNK_SIZE)
+        if sent == 0:
+            raise _short_copy(offset, size)
+        offset += sent
+
+
+def _short_copy(copied: int, size: int) -> OSError:
+    """Kernel may stop early on some filesystems, so try the next strategy."""
+    return OSError(EIO, "Copied {} of {} bytes".format(copied, size))
+
+
+_COPIERS: list[tuple[CloneStrategy, Callable[[int, int, int], None]]] = [
+    ("sparse", _copy_sparse),
+    ("copy_file_range", _copy_file_range),
+    ("sendfile", _sendfile),
+]
+
+
+def _reflink(src: Path, dst: Path) -> bool:
+    with src.open("rb") as reader, dst.open("wb") as writer:
+        try:
+            _ = ioctl(writer.fileno(), _FICLONE, reader.fileno())
+        except OSError:
+            return False
+    return True
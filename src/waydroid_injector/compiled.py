@@ -0,0 +1,126 @@
+"""Remember manifests loaded already, so they are not parsed again."""
+
+from io import BytesIO
+from os import geteuid
+from sys import hexversion
+from pickle import Pickler
+from pickle import Unpickler
+from pickle import UnpicklingError
+from typing import final
+from typing import override
+from hashlib import sha256
+from logging import getLogger
+from pathlib import Path
+from tomllib import loads
+from dataclasses import dataclass
+from waydroid_injector.xattr import EMPTY_XATTR
+from waydroid_injector.version import __version__
+from waydroid_injector.manifest import Manifest
+
+
+_EMPTY_XATTR_ID = "EMPTY_XATTR"
+
+
+class _Pickler(Pickler):
+    """Pickler which keeps shared values out of the pickle."""
+
+    @override
+    def persistent_id(self, obj: object) -> str | None:
+        return _EMPTY_XATTR_ID if obj is EMPTY_XATTR else None
+
+
+class _Unpickler(Unpickler):
+    """Unpickler which restores shared values kept out by _Pickler."""
+
+    @override
+    def persistent_load(self, pid: object) -> object:
+        if pid == _EMPTY_XATTR_ID:
+            return EMPTY_XATTR
+        raise UnpicklingError("Unknown persistent id {}.".format(pid))
+
+
+@final
+@dataclass
+class CompiledCache:
+    """Class to describe a cache of manifests loaded already.
+
+    Attributes:
+        root(Path): Where compiled manifests are storaged.
+        Each manifest file is saved as {root}/{sha256 of its path}.pickle,
+        so editing a manifest replaces its old entry.
+
+    Remarks:
+        Entries are keyed by the manifest text, the injector version and the
+        Python version, a hit skips parsing and validating entirely.
+        Entries are unpickled, so root and entries are only used when owned
+        by the current user or root, and not writable by group or others.
+    """
+
+    root: Path
+
+    @classmethod
+    def default_root(cls, waydroid: Path) -> Path:
+        """Get the default root beside the install state under waydroid's data."""
+        return waydroid / "injector/compiled"
+
+    def load(self, path: Path) -> Manifest:
+        """Load the manifest at path, from cache if it is not changed.
+
+        Broken or untrusted entries are ignored, and failing to save is not
+        an error.
+        """
+        logger = getLogger(__name__)
+        text = path.read_bytes()
+        key = self.__key(text)
+        entry = self.root / "{}.pickle".format(
+            sha256(str(path.resolve()).encode()).hexdigest(),
+        )
+        if self.root.exists(follow_symlinks=False) and not _trusted(self.root):
+            logger.warning("Ignoring %s as others may write to it.", self.root)
+            return Manifest.load(loads(text.decode()))
+        cached: object = None
+        # Missing entries are not trusted either.
+        if _trusted(entry):
+            try:
+                with entry.open("rb") as reader:
+                    cached = _Unpickler(reader).load()  # pyright: ignore[reportAny]
+            except (OSError, EOFError, UnpicklingError, AttributeError, ImportError):
+                logger.warning("Ignoring broken compiled manifest %s.", entry)
+        if isinstance(cached, tuple) and cached[0] == key:
+            logger.debug("Using compiled manifest %s.", entry)
+            manifest: object = cached[1]  # pyright: ignore[reportUnknownVariableType]
+            if isinstance(manifest, Manifest):
+                return manifest
+
+        manifest = Manifest.load(loads(text.decode()))
+        self.__save(entry, key, manifest)
+        return manifest
+
+    @staticmethod
+    def __key(text: bytes) -> str:
+        digest = sha256(text)
+        digest.update("\0{}\0{:x}".format(__version__, hexversion).encode())
+        return digest.hexdigest()
+
+    def __save(self, entry: Path, key: str, manifest: Manifest):
+        buffer = BytesIO()
+        _Pickler(buffer).dump((key, manifest))
+        tmp = entry.with_name(entry.name + ".tmp")
+        try:
+            self.root.mkdir(mode=0o700, parents=True, exist_ok=True)
+            if not _trusted(self.root):
+                return
+            _ = tmp.write_bytes(buffer.getvalue())
+            tmp.chmod(0o600)
+            _ = tmp.replace(entry)
+        except OSError:
+            getLogger(__name__).debug("Failed to save %s.", entry, exc_info=True)
+
+
+def _trusted(path: Path) -> bool:
+    """Check if path is owned by us or root, and not writable by others."""
+    try:
+        st = path.lstat()
+    except OSError:
+        return False
+    return st.st_uid in (0, geteuid()) and st.st_mode & 0o022 == 0
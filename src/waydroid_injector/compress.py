@@ -0,0 +1,113 @@
+"""Compress contents in blocks on all cores."""
+
+from io import BytesIO
+from io import BufferedIOBase
+from os import cpu_count
+from bz2 import compress as bz2_compress
+from gzip import compress as gzip_compress
+from lzma import compress as lzma_compress
+from typing import ClassVar
+from typing import final
+from logging import getLogger
+from pathlib import Path
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from waydroid_injector.type_defines import CompressType
+
+
+try:
+    from compression import zstd  # pyright: ignore[reportMissingImports, reportUnknownVariableType] # isort: skip
+except ImportError:
+    zstd = None
+
+
+@final
+class Compressor:
+    """Compress data into concatenated members, one for each block.
+
+    Blocks are compressed independently in a worker pool, which works as
+    zlib, bz2, lzma and zstd release the GIL. gzip, bzip2, xz and zstd
+    all accept concatenated members, so the output is a valid file
+    and is decompressed by common tools as a whole.
+
+    Remarks:
+        gzip members are written with mtime set to 0,
+        so the output only depends on the data and the level.
+    """
+
+    BLOCK_SIZE: ClassVar[int] = 4 * 1024 * 1024
+    LEVELS: ClassVar[dict[CompressType, range]] = {
+        "gz": range(10),
+        "bz2": range(1, 10),
+        "xz": range(10),
+        "zstd": range(-7, 23),
+    }
+
+    def __init__(
+        self,
+        compress: CompressType,
+        level: int | None = None,
+        jobs: int | None = None,
+    ):
+        """Initialize the compressor.
+
+        Args:
+            compress(CompressType): How to compress.
+            level(int | None): The compression level, see LEVELS.
+            Use the default of each format if is None.
+            jobs(int | None): How many blocks are compressed at once.
+            Use the default of ThreadPoolExecutor if is None.
+        """
+        if not self.supported(compress):
+            raise ValueError("{} is not supported by this Python.".format(compress))
+        if level is not None and level not in self.LEVELS[compress]:
+            raise ValueError("{} is not a valid level of {}.".format(level, compress))
+        self.__compress_block = self.__get_compress_block(compress, level)
+        self.__jobs = jobs
+
+    @staticmethod
+    def supported(compress: CompressType) -> bool:
+        """Check if compress is supported by this Python."""
+        return compress != "zstd" or zstd is not None
+
+    def compress(self, reader: BufferedIOBase, dst: Path):
+        """Compress all data left in reader into dst."""
+        logger = getLogger(__name__)
+        blocks = 0
+        with dst.open("wb") as writer, ThreadPoolExecutor(self.__jobs) as executor:
+            # Keep a bounded window of blocks in flight, written in order.
+            window = 2 * (self.__jobs or cpu_count() or 1)
+            pending: deque[Future[bytes]] = deque()
+            while len(block := reader.read(self.BLOCK_SIZE)) > 0:
+                pending.append(executor.submit(self.__compress_block, block))
+                blocks += 1
+                if len(pending) >= window:
+                    _ = writer.write(pending.popleft().result())
+            while len(pending) > 0:
+                _ = writer.write(pending.popleft().result())
+            if blocks == 0:
+                _ = writer.write(self.__compress_block(b""))
+        logger.debug("Compressed %d blocks into %s", blocks, dst)
+
+    def compress_bytes(self, data: bytes, dst: Path):
+        """Compress data into dst."""
+        self.compress(BytesIO(data), dst)
+
+    @staticmethod
+    def __get_compress_block(
+        compress: CompressType,
+        level: int | None,
+    ) -> Callable[[bytes], bytes]:
+        match compress:
+            case "gz":
+                compresslevel = 9 if level is None else level
+                return lambda data: gzip_compress(data, compresslevel, mtime=0)
+            case "bz2":
+                compresslevel = 9 if level is None else level
+                return lambda data: bz2_compress(data, compresslevel)
+            case "xz":
+                return lambda data: lzma_compress(data, preset=level)
+            case "zstd":
+                return lambda data: zstd.compress(data, level)  # pyright: ignore[reportOptionalMemberAccess, reportUnknownMemberType, reportUnknownLambdaType]
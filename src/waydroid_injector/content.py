@@ -1,58 +1,91 @@
 """A content to be created/removed."""
 
-from os import XATTR_CREATE
-from os import XATTR_REPLACE
 from os import listdir
-from os import setxattr
-from os import listxattr
-from gzip import open as gzip_open
-from shutil import copy2
-from shutil import copytree
+from os import scandir
+from sys import intern
+from stat import S_ISREG
 from typing import Any
 from typing import Self
+from typing import Final
 from typing import TypeGuard
 from typing import final
 from typing import get_args
 from typing import override
+from hashlib import sha256
+from hashlib import file_digest
 from logging import getLogger
 from pathlib import Path
+from collections import deque
 from dataclasses import field
+from dataclasses import replace
 from dataclasses import dataclass
+from collections.abc import Mapping
+from collections.abc import Iterator
+from collections.abc import Sequence
+from collections.abc import Collection
+from waydroid_injector.tree import TreeRule
+from waydroid_injector.clone import clone_file
+from waydroid_injector.clone import clone_tree
+from waydroid_injector.xattr import EMPTY_XATTR
+from waydroid_injector.xattr import apply_xattrs
+from waydroid_injector.compress import Compressor
+from waydroid_injector.type_defines import SkipMode
 from waydroid_injector.type_defines import ContentType
 from waydroid_injector.type_defines import CompressType
 from waydroid_injector.deserializable import Deserializable
 
 
+type _EntryKey = tuple[ContentType, int | None, tuple[tuple[str, str], ...]]
+
+_MODES: Final[dict[int, int]] = {}
+"""Modes loaded, so contents with the same mode share one int."""
+
+
 @final
-@dataclass
+@dataclass(slots=True)
 class Content(Deserializable):
     """Class to describe how to create/remove a content.
 
     Attributes:
-        path(Path): Where to create the content.
+        path(str): Where to create the content, formatted by get_path().
 
         type_(ContentType): What is the content.
 
         mode_override(int | None): Override default mode value.
         Defaults to None.
 
-        source(Path | None): Where to get the content.
+        source(str | None): Where to get the content, formatted by get_source().
         Defaults to None.
 
         content(str | None): Write the string as content.
         Defaults to None.
 
-        compress(CompressType | None): How to compress the content.
+        compress(CompressType | None): How to compress the content or the source.
         Defaults to None.
+
+        xattr(Mapping[str, str]): Extended attributes to set.
+        Defaults to EMPTY_XATTR.
+
+        compress_level(int | None): The level to compress with.
+        Defaults to None, which means the default level of compress.
+
+        rules(tuple[TreeRule, ...]): How to set metadata of entries if type_ is tree.
+        Defaults to empty.
+
+    Remarks:
+        A tree mirrors its source directory under path. It is expanded into
+        contents of its entries when installing, see Content.expand().
     """
 
-    path: Path
+    path: str
     type_: ContentType
     mode_override: int | None = None
-    source: Path | None = None
+    source: str | None = None
     content: str | None = None
     compress: CompressType | None = None
-    xattr: dict[str, str] = field(default_factory=dict)
+    xattr: Mapping[str, str] = field(default_factory=lambda: EMPTY_XATTR)
+    compress_level: int | None = None
+    rules: tuple[TreeRule, ...] = ()
 
     @property
     def mode(self) -> int:
@@ -60,7 +93,7 @@ class Content(Deserializable):
 
         If mode_override is None, we will use default value instead.
         Default value depends on type_:
-            0o755 if directory,
+            0o755 if directory or tree,
             0o644 if file,
             0o777 if link.
         """
@@ -69,14 +102,30 @@ class Content(Deserializable):
     @property
     def __default_mode(self) -> int:
         match self.type_:
-            case "directory":
+            case "directory" | "tree":
                 return 0o755
             case "file":
                 return 0o644
             case "link":
                 return 0o777
 
-    def create(  # noqa: PLR0913
+    def get_path(self, overlay: Path, overlay_rw: Path, user_data: Path) -> Path:
+        """Get where to create the content.
+
+        Args:
+            overlay(Path): The overlay folder in waydroid's data.
+            overlay_rw(Path): The overlay_rw folder in waydroid's data.
+            user_data(Path): The waydroid.host_data_path value in waydroid.prop file.
+        """
+        return Path(
+            self.path.format(
+                overlay=overlay,
+                overlay_rw=overlay_rw,
+                user_data=user_data,
+            ),
+        )
+
+    def get_source(  # noqa: PLR0913
         self,
         srcdir: Path,
         name: str,
@@ -84,8 +133,8 @@ class Content(Deserializable):
         overlay: Path,
         overlay_rw: Path,
         user_data: Path,
-    ):
-        """Create the content.
+    ) -> Path | None:
+        """Get where to get the content, None if it has no source.
 
         Args:
             srcdir(Path): Where the source contents are storaged.
@@ -95,50 +144,168 @@ class Content(Deserializable):
             overlay_rw(Path): The overlay_rw folder in waydroid's data.
             user_data(Path): The waydroid.host_data_path value in waydroid.prop file.
         """
-        logger = getLogger(__name__)
-        path = Path(
-            str(self.path).format(
+        if self.source is None:
+            return None
+        return Path(
+            self.source.format(
+                srcdir=srcdir,
+                name=name,
+                version=version,
                 overlay=overlay,
                 overlay_rw=overlay_rw,
                 user_data=user_data,
             ),
         )
-        source = (
-            Path(
-                str(self.source).format(
-                    srcdir=srcdir,
-                    name=name,
-                    version=version,
-                    overlay=overlay,
-                    overlay_rw=overlay_rw,
-                    user_data=user_data,
-                ),
+
+    def create(  # noqa: PLR0913
+        self,
+        srcdir: Path,
+        name: str,
+        version: str,
+        overlay: Path,
+        overlay_rw: Path,
+        user_data: Path,
+    ):
+        """Create the content.
+
+        Args:
+            srcdir(Path): Where the source contents are storaged.
+            name(str): The name value in manifest.
+            version(str): The version value in manifest.
+            overlay(Path): The overlay folder in waydroid's data.
+            overlay_rw(Path): The overlay_rw folder in waydroid's data.
+            user_data(Path): The waydroid.host_data_path value in waydroid.prop file.
+        """
+        for content, path, source in self.expand(
+            self.get_path(overlay, overlay_rw, user_data),
+            self.get_source(srcdir, name, version, overlay, overlay_rw, user_data),
+        ):
+            path.parent.mkdir(exist_ok=True, parents=True)
+            content.create_at(path, source)
+
+    def expand(
+        self,
+        path: Path,
+        source: Path | None,
+    ) -> Iterator[tuple[Self, Path, Path | None]]:
+        """Get contents to create, with paths resolved already.
+
+        A tree is expanded while walking its source with scandir, from top
+        to bottom, so parents are always yielded before their children.
+        Entries with the same metadata share one content.
+        Other contents are yielded as is.
+
+        Args:
+            path(Path): Where to create the content.
+            source(Path | None): Where to get the content.
+        """
+        if self.type_ != "tree":
+            yield self, path, source
+            return
+        if source is None or not source.is_dir():
+            getLogger(__name__).warning("Source of tree %s is not a directory.", path)
+            return
+        shared: dict[_EntryKey, Self] = {}
+        pending = deque([(source, path, "")])
+        while len(pending) > 0:
+            src_dir, dst_dir, prefix = pending.popleft()
+            with scandir(src_dir) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+            for entry in entries:
+                relative = prefix + entry.name
+                src = Path(entry.path)
+                dst = dst_dir / entry.name
+                if entry.is_symlink():
+                    target = src.readlink()
+                    yield self.__entry("link", relative, None, shared), dst, target
+                    continue
+                mode = entry.stat(follow_symlinks=False).st_mode & 0o777
+                if entry.is_dir(follow_symlinks=False):
+                    yield self.__entry("directory", relative, mode, shared), dst, None
+                    pending.append((src, dst, relative + "/"))
+                else:
+                    yield self.__entry("file", relative, mode, shared), dst, src
+
+    def __entry(
+        self,
+        type_: ContentType,
+        relative: str,
+        mode: int | None,
+        shared: dict[_EntryKey, Self],
+    ) -> Self:
+        """Get the content of an entry in tree, after applying rules."""
+        xattr = self.xattr
+        for rule in self.rules:
+            if rule.matches(relative):
+                mode = mode if rule.mode is None or type_ == "link" else rule.mode
+                xattr = {**xattr, **rule.xattr} if len(rule.xattr) > 0 else xattr
+        key = (type_, mode, tuple(sorted(xattr.items())))
+        if key not in shared:
+            shared[key] = replace(
+                self,
+                type_=type_,
+                mode_override=mode,
+                compress=None,
+                xattr=xattr,
+                compress_level=None,
+                rules=(),
             )
-            if self.source is not None
-            else None
-        )
+        return shared[key]
+
+    def create_at(self, path: Path, source: Path | None):
+        """Create the content with paths resolved already.
 
-        path.parent.mkdir(exist_ok=True, parents=True)
+        Args:
+            path(Path): Where to create the content. Its parent should exist.
+            source(Path | None): Where to get the content.
+        """
+        logger = getLogger(__name__)
+        if self.type_ == "tree":
+            raise ValueError("Content of tree should be expanded first.")
         if path.is_file():
             logger.warning("File at %s exists.", path)
+        self.__write(path, source)
+        self.repair(path)
+
+    def repair(self, path: Path):
+        """Set mode and xattr of the content created at path, if they differ.
+
+        Args:
+            path(Path): Where the content is created.
+        """
+        logger = getLogger(__name__)
+        if (
+            path.exists(follow_symlinks=False)
+            and path.lstat().st_mode & 0o777 != self.mode
+        ):
+            logger.debug("Changing mode to %o", self.mode)
+            path.lchmod(self.mode)
+
+        written = apply_xattrs(path, self.__encoded_xattr)
+        if written > 0:
+            logger.debug("Set %d of %d xattrs", written, len(self.xattr))
 
+    def __write(self, path: Path, source: Path | None):
+        logger = getLogger(__name__)
         if self.content is not None:
-            match self.compress:
-                case "gz":
-                    logger.debug("Compressing content with gzip...")
-                    with gzip_open(path, "wt") as writer:
-                        _ = writer.write(self.content)
-                case None:
-                    logger.debug("Writing content without compression...")
-                    _ = path.write_text(self.content)
+            if self.compress is not None:
+                logger.debug("Compressing content with %s...", self.compress)
+                self.__compressor.compress_bytes(self.content.encode(), path)
+            else:
+                logger.debug("Writing content without compression...")
+                _ = path.write_text(self.content)
+        elif source is not None and self.type_ == "file" and self.compress is not None:
+            logger.debug("Compressing file from %s to %s...", source, path)
+            with source.open("rb") as reader:
+                self.__compressor.compress(reader, path)
         elif source is not None:
             match self.type_:
                 case "directory":
                     logger.debug("Copying directory from %s to %s...", source, path)
-                    copytree(source, path, dirs_exist_ok=True)
+                    clone_tree(source, path)
                 case "file":
                     logger.debug("Copying file from %s to %s...", source, path)
-                    copy2(source, path)
+                    _ = clone_file(source, path)
                 case "link":
                     logger.debug(
                         "Creating symbolic link at %s points to %s",
@@ -146,6 +313,8 @@ class Content(Deserializable):
                         source,
                     )
                     path.symlink_to(source, source.is_dir())
+                case "tree":
+                    raise ValueError("Content of tree should be expanded first.")
         elif self.type_ == "directory":
             logger.debug("Creating empty directory at %s", path)
             path.mkdir(parents=True, exist_ok=True)
@@ -153,24 +322,57 @@ class Content(Deserializable):
             logger.debug("Creating empty file at %s", path)
             path.touch(exist_ok=True)
 
-        if (
-            path.exists(follow_symlinks=False)
-            and path.lstat().st_mode & 0o777 != self.mode
-        ):
-            logger.debug("Changing mode to %o", self.mode)
-            path.lchmod(self.mode)
+    @property
+    def __compressor(self) -> Compressor:
+        if self.compress is None:
+            raise ValueError("Content.compress is None.")
+        return Compressor(self.compress, self.compress_level)
 
-        for key, value in self.xattr.items():
-            logger.debug("Setting xattr %s=%s", key, value)
-            setxattr(
-                path,
-                key,
-                value.encode(),
-                XATTR_REPLACE
-                if key in listxattr(path, follow_symlinks=False)
-                else XATTR_CREATE,
-                follow_symlinks=False,
-            )
+    @property
+    def __encoded_xattr(self) -> dict[str, bytes]:
+        return {key: value.encode() for key, value in self.xattr.items()}
+
+    def is_unchanged(
+        self,
+        path: Path,
+        source: Path | None,
+        skip_unchanged: SkipMode,
+    ) -> bool:
+        """Check if data of the file at path is the same as the content.
+
+        Only uncompressed files are checked. Inline contents are compared
+        directly. Sources are compared by size and mtime, as copies keep
+        mtime of sources, or by size and sha256 with digest mode.
+        Mode and xattr are not compared, see Content.repair().
+
+        Args:
+            path(Path): Where the content is created.
+            source(Path | None): Where to get the content.
+            skip_unchanged(SkipMode): How to compare data of the file.
+        """
+        try:
+            st = path.lstat()
+        except FileNotFoundError:
+            return False
+        if self.type_ != "file" or self.compress is not None or not S_ISREG(st.st_mode):
+            return False
+        if self.content is not None:
+            expected = self.content.encode()
+            return st.st_size == len(expected) and path.read_bytes() == expected
+        if source is None:
+            return st.st_size == 0
+        source_st = source.stat()
+        same_size = st.st_size == source_st.st_size
+        match skip_unchanged:
+            case "stat":
+                return same_size and st.st_mtime_ns == source_st.st_mtime_ns
+            case "digest":
+                return same_size and self.__digest(path) == self.__digest(source)
+
+    @staticmethod
+    def __digest(path: Path) -> str:
+        with path.open("rb") as reader:
+            return file_digest(reader, sha256).hexdigest()
 
     def remove(
         self,
@@ -185,14 +387,15 @@ class Content(Deserializable):
             overlay_rw(Path): The overlay_rw folder in waydroid's data.
             user_data(Path): The waydroid.host_data_path value in waydroid.prop file.
         """
+        self.remove_at(self.get_path(overlay, overlay_rw, user_data))
+
+    def remove_at(self, path: Path):
+        """Remove the content with path resolved already.
+
+        Args:
+            path(Path): Where the content is created.
+        """
         logger = getLogger(__name__)
-        path = Path(
-            str(self.path).format(
-                overlay=overlay,
-                overlay_rw=overlay_rw,
-                user_data=user_data,
-            ),
-        )
         if path.exists(follow_symlinks=False):
             match self.type_:
                 case "directory":
@@ -202,6 +405,8 @@ class Content(Deserializable):
                 case "file" | "link":
                     logger.debug("Removing file/link %s...", path)
                     path.unlink()
+                case "tree":
+                    raise ValueError("Content of tree should be expanded first.")
         else:
             logger.warning("%s is not found.", path)
 
@@ -212,15 +417,14 @@ class Content(Deserializable):
             self.content is not None
             or self.source is not None
             or self.type_ == "directory"
-        )
+        ) and (self.type_ != "tree" or self.source is not None)
 
     @classmethod
     @override
     def load(cls, data: dict[str, Any]) -> Self:
-        path_str: str | None = data.get("path")
-        if path_str is None:
+        path: str | None = data.get("path")
+        if path is None:
             raise ValueError("Content.path should not be None.")
-        path = Path(path_str)
         type_str = data.get("type")
 
         def ensure_type(i: Any) -> TypeGuard[ContentType]:  # noqa: ANN401 # pyright: ignore[reportAny]
@@ -228,10 +432,11 @@ class Content(Deserializable):
 
         if not ensure_type(type_str):
             raise ValueError("Content.type is not valid.")
-        type_ = type_str
+        type_: ContentType = intern(type_str)  # pyright: ignore[reportAssignmentType]
         mode_override: int | None = data.get("mode")
-        source_str: str | None = data.get("source")
-        source = Path(source_str) if source_str is not None else None
+        if mode_override is not None:
+            mode_override = _MODES.setdefault(mode_override, mode_override)
+        source: str | None = data.get("source")
         content: str | None = data.get("content")
 
         def ensure_compress(i: Any) -> TypeGuard[CompressType | None]:  # noqa: ANN401 # pyright: ignore[reportAny]
@@ -242,5 +447,64 @@ class Content(Deserializable):
             raise ValueError("Content.compress is not valid.")
         compress = compress_str
 
-        xattr: dict[str, str] = data.get("xattr", {})
-        return cls(path, type_, mode_override, source, content, compress, xattr)
+        if compress is not None and not Compressor.supported(compress):
+            raise ValueError("Content.compress is not supported by this Python.")
+        compress_level: int | None = data.get("compress-level")
+        if compress_level is not None and (
+            compress is None or compress_level not in Compressor.LEVELS[compress]
+        ):
+            raise ValueError("Content.compress-level is not valid.")
+
+        xattr = _intern_xattr(data.get("xattr", EMPTY_XATTR))  # pyright: ignore[reportAny]
+        rules = tuple(TreeRule.load(i) for i in data.get("rules", []))  # pyright: ignore[reportAny]
+        return cls(
+            path,
+            type_,
+            mode_override,
+            source,
+            content,
+            compress,
+            xattr,
+            compress_level,
+            rules,
+        )
+
+
+@final
+class ContentStream(Collection[Content]):
+    """Contents loaded one at a time while being iterated.
+
+    Remarks:
+        Contents are validated when they are reached, and loaded again
+        every time the stream is iterated, so only a few of them are alive.
+    """
+
+    __slots__ = ("__items",)
+
+    def __init__(self, items: Sequence[dict[str, Any]]):
+        """Initialize the stream.
+
+        Args:
+            items(Sequence[dict[str, Any]]): Contents in manifest, not loaded yet.
+        """
+        self.__items = items
+
+    @override
+    def __iter__(self) -> Iterator[Content]:
+        for item in self.__items:
+            yield Content.load(item)
+
+    @override
+    def __len__(self) -> int:
+        return len(self.__items)
+
+    @override
+    def __contains__(self, x: object) -> bool:
+        return any(content == x for content in self)
+
+
+def _intern_xattr(xattr: Mapping[str, str]) -> Mapping[str, str]:
+    """Get xattr with keys and values interned, as they are often the same."""
+    if len(xattr) == 0:
+        return EMPTY_XATTR
+    return {intern(key): intern(value) for key, value in xattr.items()}
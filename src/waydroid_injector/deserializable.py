@@ -7,7 +7,13 @@ from typing import Self
 
 
 class Deserializable(ABC):
-    """Basic class which can be deserialized from dict[str, Any]."""
+    """Basic class which can be deserialized from dict[str, Any].
+
+    Remarks:
+        It has no instance attributes, so slotted subclasses have no __dict__.
+    """
+
+    __slots__: tuple[()] = ()
 
     @property
     @abstractmethod
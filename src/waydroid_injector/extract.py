@@ -0,0 +1,163 @@
+"""Extract an archive without external programs."""
+
+from stat import S_ISLNK
+from typing import Any
+from typing import Self
+from typing import final
+from typing import override
+from fnmatch import fnmatch
+from logging import getLogger
+from pathlib import Path
+from pathlib import PurePosixPath
+from tarfile import TarFile
+from tarfile import open as tar_open
+from tarfile import is_tarfile
+from zipfile import ZipFile
+from zipfile import is_zipfile
+from dataclasses import field
+from dataclasses import dataclass
+from waydroid_injector.deserializable import Deserializable
+
+
+@final
+@dataclass(slots=True)
+class Extract(Deserializable):
+    """Class to describe how to extract the source.
+
+    Attributes:
+        strip_components(int): How many leading path components are removed
+        from names of members. Members with no component left are skipped.
+
+        include(list[str]): Patterns of member names to extract, after stripping.
+        A member is extracted if it or any of its parents match a pattern.
+        All members are extracted if it is empty.
+
+    Remarks:
+        tar, tar.gz, tar.bz2, tar.xz and zip archives are supported.
+        Members are streamed into srcdir one by one.
+        Symlinks may point anywhere, like absolute links in Android trees,
+        but members at or under symlinks extracted are refused,
+        so nothing is written outside srcdir through them.
+    """
+
+    strip_components: int = 0
+    include: list[str] = field(default_factory=list)
+
+    def extract(self, archive: Path, srcdir: Path):
+        """Extract archive into srcdir.
+
+        Args:
+            archive(Path): The archive to extract.
+            srcdir(Path): Where the source contents are storaged.
+        """
+        logger = getLogger(__name__)
+        if is_zipfile(archive):
+            logger.debug("Extracting zip archive %s...", archive)
+            with ZipFile(archive) as zip_file:
+                self.__extract_zip(zip_file, srcdir)
+        elif is_tarfile(archive):
+            logger.debug("Extracting tar archive %s...", archive)
+            with tar_open(archive, "r|*") as tar_file:
+                self.__extract_tar(tar_file, srcdir)
+        else:
+            raise ValueError("{} is not a supported archive.".format(archive))
+
+    def produces(self, path: PurePosixPath) -> bool:
+        """Check if extracting may produce path, without reading the archive.
+
+        Args:
+            path(PurePosixPath): The path relative to srcdir.
+        """
+        if len(self.include) == 0 or self.__included(path):
+            return True
+        # Parents of members included are created too.
+        return any(
+            len(path.parts) < len(parts)
+            and all(fnmatch(a, b) for a, b in zip(path.parts, parts, strict=False))
+            for parts in (PurePosixPath(pattern).parts for pattern in self.include)
+        )
+
+    def __included(self, path: PurePosixPath) -> bool:
+        """Check if path or any of its parents match a pattern of include."""
+        return any(
+            fnmatch(str(p), pattern)
+            for p in [path, *path.parents[:-1]]
+            for pattern in self.include
+        )
+
+    def __rename(self, name: str) -> str | None:
+        """Get name of member after stripping, None if it should be skipped."""
+        parts = PurePosixPath(name.lstrip("/")).parts[self.strip_components :]
+        if len(parts) == 0 or ".." in parts:
+            return None
+        renamed = PurePosixPath(*parts)
+        if len(self.include) > 0 and not self.__included(renamed):
+            return None
+        return str(renamed)
+
+    def __extract_tar(self, tar_file: TarFile, srcdir: Path):
+        links: set[PurePosixPath] = set()
+        for member in tar_file:
+            name = self.__rename(member.name)
+            if name is None:
+                continue
+            _check_links(links, PurePosixPath(name), member.name)
+            if member.issym():
+                links.add(PurePosixPath(name))
+            linkname = member.linkname
+            if member.islnk():
+                stripped_linkname = self.__rename(member.linkname)
+                if stripped_linkname is None:
+                    getLogger(__name__).warning(
+                        "Skipping %s as its target is not extracted.",
+                        member.name,
+                    )
+                    continue
+                linkname = stripped_linkname
+            tar_file.extract(
+                member.replace(name=name, linkname=linkname, deep=False),
+                srcdir,
+                filter="tar",
+            )
+
+    def __extract_zip(self, zip_file: ZipFile, srcdir: Path):
+        links: set[PurePosixPath] = set()
+        for info in zip_file.infolist():
+            name = self.__rename(info.filename)
+            if name is None:
+                continue
+            path = PurePosixPath(name)
+            _check_links(links, path, info.filename)
+            info.filename = name + "/" if info.is_dir() else name
+            mode = info.external_attr >> 16
+            if S_ISLNK(mode):
+                target = srcdir / name
+                target.parent.mkdir(parents=True, exist_ok=True)
+                target.unlink(missing_ok=True)
+                target.symlink_to(zip_file.read(info).decode())
+                links.add(path)
+                continue
+            extracted = Path(zip_file.extract(info, srcdir))
+            if mode & 0o7777 != 0:
+                extracted.chmod(mode & 0o777)
+
+    @property
+    @override
+    def valid(self) -> bool:
+        return self.strip_components >= 0
+
+    @classmethod
+    @override
+    def load(cls, data: dict[str, Any]) -> Self:
+        strip_components: int = data.get("strip-components", 0)
+        include: list[str] = data.get("include", [])
+        return cls(strip_components, include)
+
+
+def _check_links(links: set[PurePosixPath], path: PurePosixPath, member: str):
+    """Refuse member at path, if it is at or under a symlink extracted.
+
+    Extracting through a symlink may write outside srcdir.
+    """
+    if not links.isdisjoint([path, *path.parents]):
+        raise ValueError("{} is under a symlink.".format(member))
@@ -0,0 +1,311 @@
+"""Create and remove contents of a manifest."""
+
+from os import listdir
+from os import scandir
+from stat import S_ISDIR
+from time import perf_counter
+from typing import final
+from logging import getLogger
+from pathlib import Path
+from dataclasses import field
+from dataclasses import dataclass
+from collections.abc import Mapping
+from collections.abc import Iterable
+from collections.abc import Iterator
+from collections.abc import Collection
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from waydroid_injector.plan import PlannedContent
+from waydroid_injector.state import StateEntry
+
+
+@final
+@dataclass
+class _Dependencies:
+    """Track which earlier contents a content has to wait for.
+
+    Attributes:
+        last(dict[Path, int]): The last content using exactly a path.
+        pending(dict[Path, list[int]]): Contents using paths under a path
+        since the last content using exactly it.
+    """
+
+    last: dict[Path, int] = field(default_factory=dict)
+    pending: dict[Path, list[int]] = field(default_factory=dict)
+
+    def touching(self, path: Path) -> set[int]:
+        """Get contents using path, its parents or its children."""
+        dependencies = set(self.pending.get(path, []))
+        for p in [path, *path.parents]:
+            index = self.last.get(p)
+            if index is not None:
+                dependencies.add(index)
+        return dependencies
+
+    def add(self, index: int, path: Path):
+        """Record that content at index uses path."""
+        self.last[path] = index
+        self.pending[path] = []
+        for parent in path.parents:
+            self.pending.setdefault(parent, []).append(index)
+
+
+@final
+@dataclass
+class _Parents:
+    """Create missing parents of contents as they come, parents first.
+
+    Parents at or under an earlier content which is not a plain directory
+    are skipped, as they are up to the content.
+
+    Attributes:
+        known(set[Path]): Directories known to exist.
+        others(set[Path]): Paths of earlier contents which are not plain directories.
+        skipped(set[Path]): Directories up to earlier contents.
+        stat_calls(int): How many directories are checked.
+        mkdir_calls(int): How many directories are created.
+        replaced_calls(int): How many mkdir(parents=True) calls would be made
+        by creating parents of each content on its own.
+    """
+
+    known: set[Path] = field(default_factory=set)
+    others: set[Path] = field(default_factory=set)
+    skipped: set[Path] = field(default_factory=set)
+    stat_calls: int = 0
+    mkdir_calls: int = 0
+    replaced_calls: int = 0
+
+    def ensure(self, planned: PlannedContent) -> bool:
+        """Create missing parents of planned, and check if they exist then."""
+        self.replaced_calls += 1
+        parent = planned.path.parent
+        chain: list[Path] = []
+        ensured = True
+        for directory in [parent, *parent.parents]:
+            if directory in self.known:
+                break
+            if directory in self.skipped or directory in self.others:
+                self.skipped.update(chain)
+                self.skipped.add(directory)
+                chain = []
+                ensured = False
+                break
+            self.stat_calls += 1
+            if directory.is_dir():
+                self.known.add(directory)
+                break
+            chain.append(directory)
+        for directory in reversed(chain):
+            self.mkdir_calls += 1
+            directory.mkdir(exist_ok=True)
+            self.known.add(directory)
+        if planned.content.type_ != "directory" or planned.source is not None:
+            self.others.add(planned.path)
+        return ensured
+
+
+def create_contents(
+    contents: Iterable[PlannedContent],
+    jobs: int | None = None,
+) -> list[PlannedContent]:
+    """Create contents in a worker pool, as they come.
+
+    A content waits for earlier contents created at its path, its parents
+    or its children, and at its source, so the result is the same as
+    creating them one by one in order. Other contents are created at once,
+    even if later contents are not yielded yet.
+
+    Args:
+        contents(Iterable[PlannedContent]): Contents to create, in manifest order.
+        jobs(int | None): How many contents are created at once.
+        Use the default of ThreadPoolExecutor if is None.
+
+    Returns:
+        list[PlannedContent]: Contents created.
+
+    Remarks:
+        Contents are submitted in order, so a content only waits for
+        contents already running. When some contents fail, contents
+        depending on them are skipped, others are still created, and
+        the error of the first failed content in manifest order is raised.
+        An error raised by contents itself stops submitting at once.
+    """
+    logger = getLogger(__name__)
+    started = perf_counter()
+    dependencies = _Dependencies()
+    parents = _Parents()
+    submitted: list[PlannedContent] = []
+    futures: list[Future[None]] = []
+
+    def create(planned: PlannedContent, ensured: bool, waits: list[Future[None]]):
+        _ = wait(waits)
+        if any(future.exception() is not None for future in waits):
+            raise RuntimeError("Skipped as a content it depends on failed.")
+        planned.create(not ensured)
+
+    with ThreadPoolExecutor(jobs, "content") as executor:
+        for index, planned in enumerate(contents):
+            paths = [planned.path]
+            if planned.source is not None:
+                paths.append(planned.source)
+            indexes = {i for p in paths for i in dependencies.touching(p)}
+            waits = [futures[i] for i in sorted(indexes)]
+            ensured = parents.ensure(planned)
+            submitted.append(planned)
+            futures.append(executor.submit(create, planned, ensured, waits))
+            # Sources are recorded too, so they are not replaced while being read.
+            for p in paths:
+                dependencies.add(index, p)
+
+    logger.debug(
+        "Created %d contents with %d stat and %d mkdir calls for parents in %.3fs",
+        len(submitted),
+        parents.stat_calls,
+        parents.mkdir_calls,
+        perf_counter() - started,
+    )
+    logger.debug(
+        "Creating parents per content would make %d mkdir(parents=True) calls",
+        parents.replaced_calls,
+    )
+    errors = [
+        (planned, error)
+        for planned, future in zip(submitted, futures, strict=True)
+        if (error := future.exception()) is not None
+    ]
+    for planned, error in errors:
+        logger.error("Failed to create %s: %s", planned.path, error)
+    if len(errors) > 0:
+        raise errors[0][1]
+    return submitted
+
+
+@final
+@dataclass
+class ChangeSelector:
+    """Select contents which need to be created again, as they come.
+
+    A content is unchanged when its path is recorded with the same fingerprint,
+    and the path is not changed since recorded. Copied directories, contents
+    sharing a path with, under or reading from earlier contents are always
+    created, as they depend on the order.
+
+    Attributes:
+        installed(Mapping[Path, StateEntry]): Paths recorded for the manifest.
+        paths(set[Path]): Paths of all contents selected from so far.
+    """
+
+    installed: Mapping[Path, StateEntry]
+    paths: set[Path] = field(default_factory=set)
+    __copied: set[Path] = field(default_factory=set, init=False)
+
+    def select(
+        self,
+        contents: Iterable[PlannedContent],
+    ) -> Iterator[tuple[PlannedContent, str]]:
+        """Get contents which need to be created again, with their fingerprints.
+
+        Args:
+            contents(Iterable[PlannedContent]): Contents to create, in manifest order.
+        """
+        for planned in contents:
+            fingerprint = planned.fingerprint()
+            if self.__changed(planned, fingerprint):
+                yield planned, fingerprint
+            self.paths.add(planned.path)
+            if planned.content.type_ == "directory" and planned.source is not None:
+                self.__copied.add(planned.path)
+
+    def __changed(self, planned: PlannedContent, fingerprint: str) -> bool:
+        entry = self.installed.get(planned.path)
+        source = planned.source
+        reads_plan = (
+            source is not None
+            and planned.content.type_ != "link"
+            and any(p in self.paths for p in [source, *source.parents])
+        )
+        if (
+            entry is None
+            or entry.fingerprint != fingerprint
+            or planned.path in self.paths
+            or (planned.content.type_ == "directory" and source is not None)
+            or any(p in self.__copied for p in planned.path.parents)
+            or reads_plan
+        ):
+            return True
+        try:
+            st = planned.path.lstat()
+        except OSError:
+            return True
+        return not entry.matches(st)
+
+
+def remove_entries(entries: Iterable[StateEntry]) -> list[Path]:
+    """Remove paths recorded, children first.
+
+    Directories are only removed when they are empty.
+
+    Returns:
+        list[Path]: Paths removed.
+    """
+    logger = getLogger(__name__)
+    removed: list[Path] = []
+    for entry in sorted(entries, key=lambda e: len(e.path.parts), reverse=True):
+        path = entry.path
+        if not path.exists(follow_symlinks=False):
+            logger.warning("%s is not found.", path)
+        elif S_ISDIR(entry.mode):
+            if path.is_dir() and not path.is_symlink() and len(listdir(path)) == 0:
+                logger.debug("Removing directory %s...", path)
+                path.rmdir()
+                removed.append(path)
+        else:
+            logger.debug("Removing file/link %s...", path)
+            path.unlink()
+            removed.append(path)
+    return removed
+
+
+def remove_empty_parents(
+    removed: Iterable[Path],
+    roots: Collection[Path],
+    keeps: Collection[Path],
+) -> list[Path]:
+    """Remove parents of removed paths which become empty, children first.
+
+    Only parents under roots are visited, each of them once.
+
+    Args:
+        removed(Iterable[Path]): Paths removed.
+        roots(Collection[Path]): Folders to clean, they are never removed.
+        keeps(Collection[Path]): Folders to keep even if they are empty.
+
+    Returns:
+        list[Path]: Folders removed.
+    """
+    logger = getLogger(__name__)
+    roots = set(roots)
+    keeps = set(keeps)
+    parents: set[Path] = set()
+    for path in removed:
+        chain: list[Path] = []
+        for parent in path.parents:
+            if parent in roots or parent in parents:
+                parents.update(chain)
+                break
+            chain.append(parent)
+    cleaned: list[Path] = []
+    for parent in sorted(parents, key=lambda p: len(p.parts), reverse=True):
+        if parent in keeps:
+            continue
+        try:
+            with scandir(parent) as it:
+                if next(it, None) is not None:
+                    continue
+            parent.rmdir()
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        logger.debug("Removing %s...", parent)
+        cleaned.append(parent)
+    return cleaned
@@ -1,7 +1,6 @@
 """Install/Uninstall custom contents."""
 
 from os import geteuid
-from os import listdir
 from typing import Any
 from typing import Self
 from typing import ClassVar
@@ -12,8 +11,29 @@ from pathlib import Path
 from dataclasses import field
 from dataclasses import dataclass
 from configparser import ConfigParser
+from collections.abc import Iterable
+from collections.abc import Iterator
+from collections.abc import Collection
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
+from waydroid_injector.memo import DigestMemo
+from waydroid_injector.plan import Plan
+from waydroid_injector.plan import PlannedContent
+from waydroid_injector.cache import Cache
+from waydroid_injector.state import StateEntry
+from waydroid_injector.state import InstallState
 from waydroid_injector.source import Source
 from waydroid_injector.content import Content
+from waydroid_injector.content import ContentStream
+from waydroid_injector.validate import Problem
+from waydroid_injector.validate import Validator
+from waydroid_injector.validate import validate
+from waydroid_injector.installer import ChangeSelector
+from waydroid_injector.installer import remove_entries
+from waydroid_injector.installer import create_contents
+from waydroid_injector.installer import remove_empty_parents
+from waydroid_injector.transaction import Transaction
+from waydroid_injector.type_defines import SkipMode
 from waydroid_injector.deserializable import Deserializable
 
 
@@ -56,7 +76,7 @@ class _Environment:
 
 
 @final
-@dataclass
+@dataclass(slots=True)
 class Manifest(Deserializable):
     """Class to describe how to install contents into waydroid's data.
 
@@ -65,48 +85,88 @@ class Manifest(Deserializable):
         version(str): The version of the manifest.
         set_property(dict[str, str]): Properties to be set in waydroid's data.
         sources(list[Source]): Contents need to be obtained before installing.
-        contents(list[Content]): Contents need to be placed into waydroid's data.
+        contents(Collection[Content]): Contents need to be placed into waydroid's data.
+        A ContentStream if loaded with Manifest.stream().
     """
 
     name: str
     version: str
     set_property: dict[str, str] = field(default_factory=dict)
     sources: list[Source] = field(default_factory=list)
-    contents: list[Content] = field(default_factory=list)
+    contents: Collection[Content] = field(default_factory=list[Content])
 
-    def install(self, dry_run: bool, destdir: Path | None):
+    def install(  # noqa: PLR0913
+        self,
+        dry_run: bool,
+        destdir: Path | None,
+        jobs: int | None = None,
+        cache: Cache | None = None,
+        rehash: bool = False,
+        skip_unchanged: SkipMode | None = None,
+    ):
         """Install the manifest.
 
         Args:
             dry_run(bool): If in dry-run mode.
             destdir(Path | None): Where is the /, Use / if is None.
+            jobs(int | None): How many sources are obtained and built,
+            and how many contents are created at once.
+            Use the default of ThreadPoolExecutor if is None.
+            cache(Cache | None): The cache of downloaded sources.
+            None means no cache is used.
+            rehash(bool): If hash all sources instead of using remembered digests.
+            skip_unchanged(SkipMode | None): How to find existing files which
+            are the same as contents, so they are not written again.
+            None means files are always written.
+
+        Remarks:
+            Contents of a ContentStream are checked while they are created,
+            so they are loaded once, and a problem found rolls back the contents
+            created before it. Others are checked before doing anything.
         """
         logger = getLogger(__name__)
         logger.info("Installing %s version %s...", self.name, self.version)
+        if isinstance(self.contents, ContentStream):
+            validator = Validator(self.name, self.version, self.sources)
+            _ = self.__report(validator.problems)
+            checked = self.__checked(validator)
+        else:
+            _ = self.check()
+            checked = self.contents
         environment = _Environment.ensure_environment(dry_run, destdir)
+        self.__transaction(environment).recover()
 
-        srcdir = (
-            environment.waydroid
-            / "injector"
-            / "{name}-{version}".format(name=self.name, version=self.version)
-        )
+        srcdir = self.get_srcdir(environment.waydroid)
         srcdir.mkdir(parents=True, exist_ok=True)
-        for source in self.sources:
-            source.get(srcdir, self.name, self.version)
-            source.do_build(srcdir, self.name, self.version)
+        memo_path = srcdir.with_name(srcdir.name + ".digests.json")
+        memo = DigestMemo(memo_path) if rehash else DigestMemo.load(memo_path)
+        try:
+            self.__prepare_sources(srcdir, jobs, cache, memo)
+        finally:
+            memo.save()
 
-        for content in self.contents:
-            content.create(
+        # Contents are resolved and trees are expanded while being created.
+        contents = (
+            expanded
+            for planned in self.__resolve(
+                checked,
                 srcdir,
-                self.name,
-                self.version,
                 environment.overlay,
                 environment.overlay_rw,
                 environment.user_data,
             )
+            for expanded in planned.expand()
+        )
+        with InstallState(InstallState.default_path(environment.waydroid)) as state:
+            self.__create_contents(environment, contents, jobs, state, skip_unchanged)
 
+        keeps = {
+            output
+            for source in self.sources
+            for output in source.outputs(srcdir, self.name, self.version)
+        }
         for source in self.sources:
-            source.cleanup(srcdir, self.name, self.version)
+            source.cleanup(srcdir, self.name, self.version, keeps)
 
         parser = ConfigParser()
         if environment.cfg.is_file():
@@ -130,24 +190,27 @@ class Manifest(Deserializable):
         logger = getLogger(__name__)
         logger.info("Removing %s version %s...", self.name, self.version)
         environment = _Environment.ensure_environment(dry_run, destdir)
+        self.__transaction(environment).recover()
 
-        contents = self.contents.copy()
-        contents.reverse()
-        for content in contents:
-            content.remove(
-                environment.overlay,
-                environment.overlay_rw,
-                environment.user_data,
-            )
-
-        partitions = ["system", "vendor"]
-        overlay_keeps = [environment.overlay / partition for partition in partitions]
-        _ = self.__clean(environment.overlay, overlay_keeps)
-        if environment.overlay_rw.is_dir():
-            overlay_rw_keeps = [
-                environment.overlay_rw / partition for partition in partitions
-            ]
-            _ = self.__clean(environment.overlay_rw, overlay_rw_keeps)
+        with InstallState(InstallState.default_path(environment.waydroid)) as state:
+            installed = state.entries(self.name)
+            if len(installed) > 0:
+                removed = remove_entries(installed.values())
+                state.forget(installed)
+            else:
+                logger.warning("%s is not recorded, using manifest...", self.name)
+                plan = self.compile(
+                    environment.waydroid,
+                    environment.overlay,
+                    environment.overlay_rw,
+                    environment.user_data,
+                )
+                removed: list[Path] = []
+                for planned in reversed(list(plan.expand())):
+                    if state.owner(planned.path) is None:
+                        planned.remove()
+                        removed.append(planned.path)
+        self.__clean(environment, removed)
 
         parser = ConfigParser()
         if environment.cfg.exists():
@@ -165,19 +228,222 @@ class Manifest(Deserializable):
 
         self.__post_operation()
 
-    def __clean(self, path: Path, keeps: list[Path]) -> bool:
+    def check(self) -> list[Problem]:
+        """Find problems before doing anything, see validate().
+
+        Problems are logged, and the first fatal one is raised.
+
+        Returns:
+            list[Problem]: Problems which are not fatal.
+        """
+        return self.__report(
+            validate(self.name, self.version, self.sources, self.contents),
+        )
+
+    def __checked(self, validator: Validator) -> Iterator[Content]:
+        """Check contents one at a time while they are iterated, see check()."""
+        for content in self.contents:
+            _ = self.__report(validator.add(content))
+            yield content
+        _ = self.__report(validator.finish())
+
+    @staticmethod
+    def __report(problems: list[Problem]) -> list[Problem]:
+        """Log problems, and raise the first fatal one.
+
+        Returns:
+            list[Problem]: Problems which are not fatal.
+        """
         logger = getLogger(__name__)
-        if path.is_dir() and all(keep.is_relative_to(path) for keep in keeps):
-            for item in listdir(path):
-                p = path / item
-                if p.is_dir():
-                    keeps_for_p = [
-                        keep for keep in keeps if keep != p and keep.is_relative_to(p)
-                    ]
-                    if self.__clean(p, keeps_for_p) and p not in keeps:
-                        logger.debug("Removing %s...", p)
-                        p.rmdir()
-        return len(listdir(path)) == 0
+        fatal = [problem for problem in problems if problem.fatal]
+        for problem in problems:
+            if problem.fatal:
+                logger.error("%s", problem.message)
+            else:
+                logger.warning("%s", problem.message)
+        if len(fatal) > 0:
+            raise ValueError(
+                "Manifest has {} problems: {}".format(len(fatal), fatal[0].message),
+            )
+        return problems
+
+    def compile(
+        self,
+        waydroid: Path,
+        overlay: Path,
+        overlay_rw: Path,
+        user_data: Path,
+    ) -> Plan:
+        """Format paths of contents once against the resolved environment.
+
+        Args:
+            waydroid(Path): The waydroid's data folder.
+            overlay(Path): The overlay folder in waydroid's data.
+            overlay_rw(Path): The overlay_rw folder in waydroid's data.
+            user_data(Path): The waydroid.host_data_path value in waydroid.prop file.
+
+        Returns:
+            Plan: Contents with absolute paths, in manifest order.
+        """
+        srcdir = self.get_srcdir(waydroid)
+        return Plan(
+            srcdir,
+            list(self.__resolve(self.contents, srcdir, overlay, overlay_rw, user_data)),
+        )
+
+    def get_srcdir(self, waydroid: Path) -> Path:
+        """Get where the source contents are storaged.
+
+        Args:
+            waydroid(Path): The waydroid's data folder.
+        """
+        return (
+            waydroid
+            / "injector"
+            / "{name}-{version}".format(name=self.name, version=self.version)
+        )
+
+    def __resolve(
+        self,
+        contents: Iterable[Content],
+        srcdir: Path,
+        overlay: Path,
+        overlay_rw: Path,
+        user_data: Path,
+    ) -> Iterator[PlannedContent]:
+        """Format paths of contents one at a time, in manifest order."""
+        for content in contents:
+            yield PlannedContent(
+                content,
+                content.get_path(overlay, overlay_rw, user_data),
+                content.get_source(
+                    srcdir,
+                    self.name,
+                    self.version,
+                    overlay,
+                    overlay_rw,
+                    user_data,
+                ),
+            )
+
+    def __create_contents(
+        self,
+        environment: _Environment,
+        contents: Iterable[PlannedContent],
+        jobs: int | None,
+        state: InstallState,
+        skip_unchanged: SkipMode | None,
+    ):
+        """Create contents changed since last install and remove stale ones.
+
+        Contents flow one at a time from selecting to staging and creating,
+        so creating starts before later contents are resolved.
+        Stale contents are paths recorded for this manifest but not in contents.
+        """
+        logger = getLogger(__name__)
+        installed = state.entries(self.name)
+        selector = ChangeSelector(installed)
+        changed: list[tuple[PlannedContent, str]] = []
+
+        def select() -> Iterator[PlannedContent]:
+            for planned, fingerprint in selector.select(contents):
+                changed.append((planned, fingerprint))
+                if skip_unchanged is not None and planned.content.is_unchanged(
+                    planned.path,
+                    planned.source,
+                    skip_unchanged,
+                ):
+                    # Only metadata is repaired, the file is kept in place.
+                    planned.content.repair(planned.path)
+                else:
+                    yield planned
+
+        transaction = self.__transaction(environment)
+        try:
+            staged = create_contents(transaction.stage(select()), jobs)
+        except BaseException:
+            transaction.rollback()
+            raise
+        transaction.commit(staged)
+        logger.info(
+            "Created %d of %d contents, %d of them changed.",
+            len(staged),
+            len(selector.paths),
+            len(changed),
+        )
+
+        entries: list[StateEntry] = []
+        for planned, fingerprint in changed:
+            if planned.path.exists(follow_symlinks=False):
+                entries.append(
+                    StateEntry.capture(
+                        planned.path,
+                        self.name,
+                        self.version,
+                        planned.content.type_,
+                        dict(planned.content.xattr),
+                        fingerprint,
+                    ),
+                )
+        state.record(entries)
+
+        stale = [
+            entry for path, entry in installed.items() if path not in selector.paths
+        ]
+        removed = remove_entries(stale)
+        state.forget(entry.path for entry in stale)
+        self.__clean(environment, removed)
+
+    @staticmethod
+    def __transaction(environment: _Environment) -> Transaction:
+        return Transaction.for_roots(
+            environment.waydroid / "injector",
+            [environment.overlay, environment.overlay_rw, environment.user_data],
+        )
+
+    def __prepare_sources(
+        self,
+        srcdir: Path,
+        jobs: int | None,
+        cache: Cache | None,
+        memo: DigestMemo,
+    ):
+        """Obtain and build all sources in a worker pool.
+
+        Each source is built as soon as its own obtaining finishes,
+        builds are run one by one as they share srcdir.
+        When any of them fails, sources not started yet are cancelled,
+        running ones are waited and the error is raised again.
+        """
+        logger = getLogger(__name__)
+        file_names = [
+            source.get_file_name(self.name, self.version) for source in self.sources
+        ]
+
+        def prepare(source: Source, file_name: str):
+            source.get(srcdir, self.name, self.version, cache, memo)
+            others = [other for other in file_names if other != file_name]
+            source.do_build(srcdir, self.name, self.version, others)
+
+        with ThreadPoolExecutor(jobs, "source") as executor:
+            futures = [
+                executor.submit(prepare, source, file_name)
+                for source, file_name in zip(self.sources, file_names, strict=True)
+            ]
+            try:
+                for future in as_completed(futures):
+                    future.result()
+            except BaseException:
+                logger.error("Failed to prepare sources, aborting...")
+                executor.shutdown(cancel_futures=True)
+                raise
+
+    def __clean(self, environment: _Environment, removed: list[Path]):
+        """Remove overlay folders left empty by removed paths."""
+        partitions = ["system", "vendor"]
+        roots = [environment.overlay, environment.overlay_rw]
+        keeps = [root / partition for root in roots for partition in partitions]
+        _ = remove_empty_parents(removed, roots, keeps)
 
     def __post_operation(self):
         logger = getLogger(__name__)
@@ -197,6 +463,20 @@ class Manifest(Deserializable):
     @classmethod
     @override
     def load(cls, data: dict[str, Any]) -> Self:
+        contents = [Content.load(i) for i in data.get("contents", [])]  # pyright: ignore[reportAny]
+        return cls.__load(data, contents)
+
+    @classmethod
+    def stream(cls, data: dict[str, Any]) -> Self:
+        """Create instance whose contents are loaded one at a time.
+
+        Contents are validated when they are reached while installing,
+        an invalid content rolls back the install then.
+        """
+        return cls.__load(data, ContentStream(data.get("contents", [])))  # pyright: ignore[reportAny]
+
+    @classmethod
+    def __load(cls, data: dict[str, Any], contents: Collection[Content]) -> Self:
         name: str | None = data.get("name")
         if name is None:
             raise ValueError("Manifest.name should not be None.")
@@ -205,5 +485,4 @@ class Manifest(Deserializable):
             raise ValueError("Manifest.version should not be None.")
         set_property: dict[str, str] = data.get("set-property", {})
         sources: list[Source] = [Source.load(i) for i in data.get("sources", [])]  # pyright: ignore[reportAny]
-        contents: list[Content] = [Content.load(i) for i in data.get("contents", [])]  # pyright: ignore[reportAny]
         return cls(name, version, set_property, sources, contents)  # pyright: ignore[reportAny]
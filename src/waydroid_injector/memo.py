@@ -0,0 +1,69 @@
+"""Remember digests of files which are not changed."""
+
+from os import stat_result
+from json import dumps
+from json import loads
+from typing import Self
+from typing import final
+from logging import getLogger
+from pathlib import Path
+from dataclasses import field
+from dataclasses import dataclass
+
+
+@final
+@dataclass
+class DigestMemo:
+    """Class to describe digests of files keyed by their stat.
+
+    Attributes:
+        path(Path): Where the memo is storaged.
+        entries(dict[str, dict[str, str]]): Digests of files,
+        keyed by device, inode, size and mtime in nanoseconds.
+
+    Remarks:
+        Only entries looked up or stored are saved,
+        so digests of files no longer used are dropped.
+    """
+
+    path: Path
+    entries: dict[str, dict[str, str]] = field(default_factory=dict)
+    __used: dict[str, dict[str, str]] = field(default_factory=dict, init=False)
+
+    @staticmethod
+    def __key(st: stat_result) -> str:
+        return "{}:{}:{}:{}".format(st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def lookup(self, st: stat_result) -> dict[str, str] | None:
+        """Get digests of file with st, None if not remembered."""
+        key = self.__key(st)
+        digests = self.entries.get(key)
+        if digests is not None:
+            self.__used[key] = digests
+        return digests
+
+    def store(self, st: stat_result, digests: dict[str, str]):
+        """Remember digests of file with st."""
+        key = self.__key(st)
+        merged = self.entries.get(key, {}) | digests
+        self.entries[key] = merged
+        self.__used[key] = merged
+
+    def save(self):
+        """Save entries used into self.path."""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            _ = self.path.write_text(dumps(self.__used))
+        except OSError:
+            getLogger(__name__).warning("Failed to save %s.", self.path, exc_info=True)
+
+    @classmethod
+    def load(cls, path: Path) -> Self:
+        """Load memo from path, an empty one is returned if failed."""
+        try:
+            entries: object = loads(path.read_text())  # pyright: ignore[reportAny]
+        except (OSError, ValueError):
+            return cls(path)
+        if not isinstance(entries, dict):
+            return cls(path)
+        return cls(path, entries)  # pyright: ignore[reportUnknownArgumentType]
@@ -0,0 +1,104 @@
+"""Manifests compiled against a resolved environment."""
+
+from json import dumps
+from typing import final
+from hashlib import sha256
+from pathlib import Path
+from dataclasses import field
+from dataclasses import dataclass
+from collections.abc import Iterator
+from waydroid_injector.content import Content
+
+
+@final
+@dataclass(slots=True)
+class PlannedContent:
+    """Class to describe a content with its paths resolved.
+
+    Attributes:
+        content(Content): The content in manifest.
+        path(Path): Where to create the content.
+        source(Path | None): Where to get the content.
+    """
+
+    content: Content
+    path: Path
+    source: Path | None
+
+    def create(self, make_parents: bool = True):
+        """Create the content at resolved paths.
+
+        Args:
+            make_parents(bool): If create parents of path when missing.
+            Use False when they are known to exist.
+        """
+        if make_parents:
+            self.path.parent.mkdir(exist_ok=True, parents=True)
+        self.content.create_at(self.path, self.source)
+
+    def fingerprint(self) -> str:
+        """Digest of what the content is made from.
+
+        It covers the content in manifest, and the stat of source file
+        when it is copied, so a rebuilt source changes it.
+        """
+        source_stat = None
+        if self.source is not None and self.content.type_ == "file":
+            try:
+                st = self.source.stat()
+            except OSError:
+                pass
+            else:
+                source_stat = "{}:{}:{}:{}".format(
+                    st.st_dev,
+                    st.st_ino,
+                    st.st_size,
+                    st.st_mtime_ns,
+                )
+        data = {
+            "type": self.content.type_,
+            "mode": self.content.mode,
+            "xattr": dict(self.content.xattr),
+            "content": self.content.content,
+            "compress": self.content.compress,
+            "compress-level": self.content.compress_level,
+            "source": str(self.source) if self.source is not None else None,
+            "source-stat": source_stat,
+        }
+        return sha256(dumps(data, sort_keys=True).encode()).hexdigest()
+
+    def remove(self):
+        """Remove the content at resolved path."""
+        self.content.remove_at(self.path)
+
+    def expand(self) -> Iterator["PlannedContent"]:
+        """Get contents to create, entries of it if is a tree.
+
+        See Content.expand() for details.
+        """
+        for content, path, source in self.content.expand(self.path, self.source):
+            yield PlannedContent(content, path, source)
+
+
+@final
+@dataclass(slots=True)
+class Plan:
+    """Class to describe what to do to install/uninstall a manifest.
+
+    Attributes:
+        srcdir(Path): Where the source contents are storaged.
+        contents(list[PlannedContent]): Contents to create, in manifest order.
+
+    Remarks:
+        Use Manifest.compile() to create instance.
+        Templates in paths are formatted once when compiling.
+        Trees are kept as is, as their sources may not exist yet.
+    """
+
+    srcdir: Path
+    contents: list[PlannedContent] = field(default_factory=list)
+
+    def expand(self) -> Iterator[PlannedContent]:
+        """Get contents to create with trees expanded, in manifest order."""
+        for planned in self.contents:
+            yield from planned.expand()
@@ -1,24 +1,81 @@
 """Obtain content for Manifest."""
 
 from os import listdir
-from shutil import copy2
+from http import HTTPStatus
+from json import dumps
+from json import loads
+from time import monotonic
 from shutil import rmtree
+from typing import IO
 from typing import Any
 from typing import Self
+from typing import ClassVar
 from typing import final
 from typing import override
 from logging import getLogger
 from pathlib import Path
+from threading import Lock
+from dataclasses import field
 from dataclasses import dataclass
+from http.client import HTTPMessage
+from http.client import HTTPException
+from http.client import IncompleteRead
+from urllib.error import HTTPError
 from urllib.parse import urlparse
+from urllib.request import Request
+from urllib.request import HTTPRedirectHandler
 from urllib.request import urlopen
+from urllib.request import build_opener
+from collections.abc import Iterator
+from collections.abc import Collection
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
+from waydroid_injector.memo import DigestMemo
 from waydroid_injector.build import Build
+from waydroid_injector.cache import Cache
+from waydroid_injector.clone import clone_file
+from waydroid_injector.version import __version__
+from waydroid_injector.checksum import Hasher
 from waydroid_injector.checksum import Checksum
 from waydroid_injector.deserializable import Deserializable
 
 
+# Builds sharing a srcdir are run one by one, so their outputs can be told apart.
+_build_locks: dict[Path, Lock] = {}
+_build_locks_lock = Lock()
+
+
+def _build_lock(srcdir: Path) -> Lock:
+    """Get the lock of building in srcdir."""
+    with _build_locks_lock:
+        return _build_locks.setdefault(srcdir.resolve(), Lock())
+
+
+class _HeadRedirectHandler(HTTPRedirectHandler):
+    """Redirect handler which keeps HEAD requests as HEAD.
+
+    urllib follows redirects of HEAD requests with GET requests,
+    which download whole files.
+    """
+
+    @override
+    def redirect_request(
+        self,
+        req: Request,
+        fp: IO[bytes],
+        code: int,
+        msg: str,
+        headers: HTTPMessage,
+        newurl: str,
+    ) -> Request | None:
+        redirected = super().redirect_request(req, fp, code, msg, headers, newurl)
+        if redirected is not None and req.get_method() == "HEAD":
+            redirected.method = "HEAD"
+        return redirected
+
+
 @final
-@dataclass
+@dataclass(slots=True)
 class Source(Deserializable):
     """Class to describe how to prepare contents required by the manifest.
 
@@ -32,10 +89,12 @@ class Source(Deserializable):
         build(Build |None): The build in manifest.sources.
         None means there is no need to build the source.
 
-        url(str | None): The url to the source.
+        url(str | list[str] | None): The url to the source, or urls to its mirrors.
         Only http/https/ftp protocol is accepted.
+        Mirrors are probed at the same time and the first one responding is used,
+        others are tried in the order of responding if it fails.
 
-        path(Path | None): The path to the source.
+        path(str | None): The path to the source, formatted when used.
 
     Remarks:
         One of url and path must not be None.
@@ -44,27 +103,42 @@ class Source(Deserializable):
     file_name: str | None
     checksum: Checksum | None
     build: Build | None
-    url: str | None = None
-    path: Path | None = None
+    url: str | list[str] | None = None
+    path: str | None = None
+    __file_names: dict[tuple[str, str], str] = field(
+        default_factory=dict,
+        init=False,
+        repr=False,
+        compare=False,
+    )
+
+    PROBE_TIMEOUT: ClassVar[float] = 10
 
-    def get(self, srcdir: Path, name: str, version: str):
+    def get(
+        self,
+        srcdir: Path,
+        name: str,
+        version: str,
+        cache: Cache | None = None,
+        memo: DigestMemo | None = None,
+    ):
         """Get the source and build it.
 
         Args:
             srcdir(Path): Where the source contents are storaged.
             name(str): The name in manifest.
             version(str): The version in manifest.
+            cache(Cache | None): Where to find downloaded sources by sha256.
+            Downloaded sources with sha256 are stored into it.
+            None means no cache is used.
+            memo(DigestMemo | None): Where to find and remember digests of sources.
+            None means sources are always hashed.
         """
         logger = getLogger(__name__)
         allowed_url_schemes = ("http:", "https:", "ftp:")
-        url = (
-            self.url.format(name=name, version=version)
-            if self.url is not None
-            else None
-        )
-
+        urls = self.__get_urls(name, version)
         path = (
-            Path(str(self.path).format(name=name, version=version))
+            Path(self.path.format(name=name, version=version))
             if self.path is not None
             else None
         )
@@ -74,7 +148,7 @@ class Source(Deserializable):
         obtain = True
         if dst.is_file():
             if self.checksum is not None:
-                if self.checksum.check(dst.read_bytes()):
+                if self.checksum.check_file(dst, memo):
                     logger.info("Checksum match.")
                     obtain = False
                 else:
@@ -87,58 +161,330 @@ class Source(Deserializable):
         if obtain:
             if path is not None:
                 logger.info("Obtaining %s from %s", file_name, path)
-                copy2(path, dst)
-            elif url is not None and url.startswith(allowed_url_schemes):
-                logger.info("Obtaining %s from %s", file_name, url)
-                with urlopen(url) as resp:  # noqa: S310 # pyright: ignore[reportAny]
-                    _ = dst.write_bytes(resp.read())  # pyright: ignore[reportAny]
+                # Only read-only use is guaranteed when there is no build.
+                _ = clone_file(path, dst, self.build is None)
+                matched = self.checksum is None or self.checksum.check_file(dst, memo)
+                if not matched:
+                    raise RuntimeError("Checksum mismatch.")
+            elif len(urls) > 0 and all(
+                url.startswith(allowed_url_schemes) for url in urls
+            ):
+                self.__obtain_urls(urls, dst, cache, memo)
             else:
                 raise RuntimeError("Does not know how to obtain this source.")
-            if self.checksum is not None and not self.checksum.check(dst.read_bytes()):
-                raise RuntimeError("Checksum mismatch.")
         else:
             logger.info("Found required source, skipping obtaining...")
 
-    def do_build(self, srcdir: Path, name: str, version: str):
+    def __obtain_urls(
+        self,
+        urls: list[str],
+        dst: Path,
+        cache: Cache | None,
+        memo: DigestMemo | None,
+    ):
+        sha256 = self.checksum.sha256 if self.checksum is not None else None
+        if cache is not None and sha256 is not None:
+            if self.__get_from_cache(cache, sha256, dst, memo):
+                return
+            self.__download_mirrors(urls, dst, memo)
+            # Only read-only use is guaranteed when there is no build.
+            cache.put(sha256, dst, self.build is None)
+        else:
+            self.__download_mirrors(urls, dst, memo)
+
+    def __download_mirrors(self, urls: list[str], dst: Path, memo: DigestMemo | None):
+        """Download dst from the first url working, the last error is raised if none."""
+        logger = getLogger(__name__)
+        errors: list[Exception] = []
+        for url in self.__rank_mirrors(urls):
+            logger.info("Obtaining %s from %s", dst.name, url)
+            try:
+                self.__download(url, dst, memo)
+            except (OSError, HTTPException, RuntimeError) as e:
+                logger.warning("Failed to obtain %s from %s: %s", dst.name, url, e)
+                errors.append(e)
+            else:
+                return
+        raise errors[-1]
+
+    def __rank_mirrors(self, urls: list[str]) -> Iterator[str]:
+        """Yield urls in the order of responding to a HEAD request.
+
+        All urls are probed at the same time, and the first one responding
+        is yielded as soon as possible. Urls failed to respond are yielded last.
+        Redirects are followed with HEAD requests too, so probing never
+        downloads the files.
+        """
+        logger = getLogger(__name__)
+        if len(urls) == 1:
+            yield from urls
+            return
+
+        def probe(url: str) -> float:
+            start = monotonic()
+            opener = build_opener(_HeadRedirectHandler)
+            with opener.open(Request(url, method="HEAD"), timeout=self.PROBE_TIMEOUT):  # noqa: S310
+                return monotonic() - start
+
+        executor = ThreadPoolExecutor(len(urls), "mirror")
+        try:
+            futures = {executor.submit(probe, url): url for url in urls}
+            failed: list[str] = []
+            for future in as_completed(futures):
+                url = futures[future]
+                try:
+                    logger.debug("%s responds in %.3fs", url, future.result())
+                except (OSError, HTTPException) as e:
+                    logger.debug("Failed to probe %s: %s", url, e)
+                    failed.append(url)
+                else:
+                    yield url
+            yield from failed
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def __get_from_cache(
+        self,
+        cache: Cache,
+        sha256: str,
+        dst: Path,
+        memo: DigestMemo | None,
+    ) -> bool:
+        if not cache.get(sha256, dst, self.build is None):
+            return False
+        if self.checksum is not None and not self.checksum.check_file(dst, memo):
+            getLogger(__name__).error("Cached %s is corrupted.", sha256)
+            cache.remove(sha256)
+            dst.unlink()
+            return False
+        return True
+
+    def __download(self, url: str, dst: Path, memo: DigestMemo | None):
+        """Download url to dst, checking checksum while writing.
+
+        Content is written into {dst}.part in chunks, and is only moved to dst
+        when the checksum matches. If the download is interrupted, the part file
+        is kept and the next download resumes it with a HTTP Range request.
+        """
+        part = dst.with_name(dst.name + ".part")
+        try:
+            hasher = self.__fetch(url, part)
+        except HTTPError as e:
+            if e.code != HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE:
+                raise
+            getLogger(__name__).warning("Failed to resume %s, restarting...", part)
+            part.unlink()
+            hasher = self.__fetch(url, part)
+        if hasher is not None and not hasher.match:
+            part.unlink()
+            raise RuntimeError("Checksum mismatch.")
+        _ = part.replace(dst)
+        if memo is not None and hasher is not None:
+            memo.store(dst.stat(), hasher.hexdigests)
+
+    def __fetch(self, url: str, part: Path) -> Hasher | None:
+        logger = getLogger(__name__)
+        offset = part.stat().st_size if part.is_file() else 0
+        headers = {"Range": "bytes={}-".format(offset)} if offset > 0 else {}
+        with urlopen(Request(url, headers=headers)) as resp:  # noqa: S310 # pyright: ignore[reportAny]
+            content_range: str = resp.headers.get("Content-Range", "")  # pyright: ignore[reportAny]
+            partial = resp.status == HTTPStatus.PARTIAL_CONTENT  # pyright: ignore[reportAny]
+            resume = partial and content_range.startswith("bytes {}-".format(offset))
+            if partial and not resume:
+                if offset == 0:
+                    raise RuntimeError("Unexpected partial content.")
+                # It is neither the whole file nor the rest of part.
+                logger.warning("Unusable partial content for %s, restarting...", part)
+                resp.close()  # pyright: ignore[reportAny]
+                part.unlink()
+                return self.__fetch(url, part)
+            hasher = self.checksum.hasher() if self.checksum is not None else None
+            if resume:
+                logger.info("Resuming %s from %d bytes...", part, offset)
+                if hasher is not None:
+                    with part.open("rb") as reader:
+                        _ = hasher.update_from(reader)
+            elif offset > 0:
+                logger.info("Server does not support resuming, restarting...")
+            received = 0
+            with part.open("ab" if resume else "wb") as writer:
+                while len(chunk := resp.read(Hasher.CHUNK_SIZE)) > 0:  # pyright: ignore[reportAny]
+                    received += writer.write(chunk)  # pyright: ignore[reportAny]
+                    if hasher is not None:
+                        hasher.update(chunk)  # pyright: ignore[reportAny]
+            content_length: str | None = resp.headers.get("Content-Length")  # pyright: ignore[reportAny]
+            if content_length is not None and received < int(content_length):
+                raise IncompleteRead(b"", int(content_length) - received)
+        return hasher
+
+    def do_build(
+        self,
+        srcdir: Path,
+        name: str,
+        version: str,
+        others: Collection[str] = (),
+    ):
         """Call self.build.build() if self.build is not None.
 
+        A stamp recording the source digest, the expanded build and the injector
+        version is written after building. Building is skipped when the stamp
+        matches and all outputs recorded in it are present.
+
+        Builds in the same srcdir are run one by one, and files appearing
+        while building are recorded as its outputs, except ones in others.
+
         Args:
             srcdir(Path): Where the source contents are storaged.
             name(str): The name in manifest.
             version(str): The version in manifest.
+            others(Collection[str]): Names of files obtained by other sources,
+            which may appear while building.
         """
-        if self.build is not None:
-            file_name = self.__get_file_name(name, version)
+        logger = getLogger(__name__)
+        if self.build is None:
+            return
+        file_name = self.__get_file_name(name, version)
+        stamp_path = srcdir / self.__get_stamp_name(file_name)
+        with _build_lock(srcdir):
+            inputs = self.__get_stamp_inputs(srcdir, file_name)
+            if inputs is None:
+                logger.warning("Building %s without stamp...", file_name)
+                stamp_path.unlink(missing_ok=True)
+                self.build.build(srcdir, file_name)
+                return
+            stamp = self.__load_stamp(stamp_path)
+            if stamp is not None:
+                outputs = self.__get_stamp_outputs(stamp)
+                if stamp.get("inputs") == inputs and all(
+                    (srcdir / output).exists() or (srcdir / output).is_symlink()
+                    for output in outputs
+                ):
+                    logger.info("%s is built already, skipping...", file_name)
+                    return
+                stamp_path.unlink()
+                for output in outputs:
+                    self.__remove(srcdir / output)
+
+            obtained = {file_name, *others}
+            ignored = obtained | {fname + ".part" for fname in obtained}
+            before = set(listdir(srcdir))
             self.build.build(srcdir, file_name)
+            outputs = sorted(set(listdir(srcdir)) - before - ignored)
+            _ = stamp_path.write_text(dumps({"inputs": inputs, "outputs": outputs}))
+
+    def outputs(self, srcdir: Path, name: str, version: str) -> set[str]:
+        """Get names of files under srcdir which belong to this source.
+
+        They are the file obtained, and the stamp and outputs of the last build.
+
+        Args:
+            srcdir(Path): Where the source contents are storaged.
+            name(str): The name in manifest.
+            version(str): The version in manifest.
+        """
+        file_name = self.__get_file_name(name, version)
+        stamp_name = self.__get_stamp_name(file_name)
+        stamp = self.__load_stamp(srcdir / stamp_name)
+        if stamp is None:
+            return {file_name}
+        return {file_name, stamp_name, *self.__get_stamp_outputs(stamp)}
 
-    def cleanup(self, srcdir: Path, name: str, version: str):
+    def cleanup(
+        self,
+        srcdir: Path,
+        name: str,
+        version: str,
+        keeps: Collection[str] = (),
+    ):
         """Do cleanup to remove contents generated by build sequence.
 
+        Outputs of stamped builds are kept so building can be skipped next time.
+
         Args:
             srcdir(Path): Where the source contents are storaged.
             name(str): The name in manifest.
             version(str): The version in manifest.
+            keeps(Collection[str]): Names of extra files to keep,
+            like outputs of other sources.
         """
         logger = getLogger(__name__)
-        file_name = self.__get_file_name(name, version)
+        outputs = self.outputs(srcdir, name, version)
         for fname in listdir(srcdir):
-            if fname != file_name:
+            if fname not in outputs and fname not in keeps:
                 target = srcdir / fname
                 logger.debug("Removing %s...", target)
-                rmtree(target) if target.is_dir() else target.unlink()
+                self.__remove(target)
+
+    @staticmethod
+    def __remove(target: Path):
+        if target.is_dir() and not target.is_symlink():
+            rmtree(target)
+        else:
+            target.unlink(missing_ok=True)
+
+    @staticmethod
+    def __get_stamp_name(file_name: str) -> str:
+        return ".{}.stamp".format(file_name)
+
+    @staticmethod
+    def __load_stamp(stamp_path: Path) -> dict[str, object] | None:
+        try:
+            stamp: object = loads(stamp_path.read_text())  # pyright: ignore[reportAny]
+        except (OSError, ValueError):
+            return None
+        return stamp if isinstance(stamp, dict) else None  # pyright: ignore[reportUnknownVariableType]
+
+    @staticmethod
+    def __get_stamp_outputs(stamp: dict[str, object]) -> list[str]:
+        outputs = stamp.get("outputs")
+        if not isinstance(outputs, list):
+            return []
+        return [output for output in outputs if isinstance(output, str)]  # pyright: ignore[reportUnknownVariableType]
+
+    def __get_stamp_inputs(
+        self,
+        srcdir: Path,
+        file_name: str,
+    ) -> dict[str, object] | None:
+        src = srcdir / file_name
+        digests = self.checksum.digests if self.checksum is not None else {}
+        if len(digests) == 0:
+            if not src.is_file():
+                return None
+            st = src.stat()
+            digests = {"stat": "{}:{}".format(st.st_size, st.st_mtime_ns)}
+        build = self.build.fingerprint(srcdir, file_name) if self.build else None
+        return {"digests": digests, "build": build, "version": __version__}
+
+    def __get_urls(self, name: str, version: str) -> list[str]:
+        urls = [self.url] if isinstance(self.url, str) else self.url or []
+        return [url.format(name=name, version=version) for url in urls]
+
+    def get_file_name(self, name: str, version: str) -> str:
+        """Get the name of file obtained under srcdir.
+
+        Args:
+            name(str): The name in manifest.
+            version(str): The version in manifest.
+        """
+        return self.__get_file_name(name, version)
 
     def __get_file_name(self, name: str, version: str) -> str:
+        file_name = self.__file_names.get((name, version))
+        if file_name is None:
+            file_name = self.__format_file_name(name, version)
+            self.__file_names[name, version] = file_name
+        return file_name
+
+    def __format_file_name(self, name: str, version: str) -> str:
         if self.file_name is not None:
             return self.file_name.format(name=name, version=version)
 
-        url = (
-            self.url.format(name=name, version=version)
-            if self.url is not None
-            else None
-        )
+        urls = self.__get_urls(name, version)
+        url = urls[0] if len(urls) > 0 else None
 
         path = (
-            Path(str(self.path).format(name=name, version=version))
+            Path(self.path.format(name=name, version=version))
             if self.path is not None
             else None
         )
@@ -156,7 +502,10 @@ class Source(Deserializable):
     @property
     @override
     def valid(self) -> bool:
-        return self.url is not None or (self.path is not None and self.path.exists())
+        has_url = isinstance(self.url, str) or (
+            self.url is not None and len(self.url) > 0
+        )
+        return has_url or (self.path is not None and Path(self.path).exists())
 
     @classmethod
     @override
@@ -170,7 +519,6 @@ class Source(Deserializable):
         build = Build.load(build_dict) if build_dict is not None else None  # pyright: ignore[reportAny]
         if build is not None and not build.valid:
             raise ValueError("Build is not valid.")
-        url: str | None = data.get("url")
-        path_str: str | None = data.get("path")
-        path = Path(path_str) if path_str is not None else None
+        url: str | list[str] | None = data.get("url")
+        path: str | None = data.get("path")
         return cls(file_name, checksum, build, url, path)
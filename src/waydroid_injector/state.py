@@ -0,0 +1,240 @@
+"""Remember what is installed into waydroid's data."""
+
+from os import stat_result
+from json import dumps
+from json import loads
+from stat import S_ISDIR
+from stat import S_ISREG
+from types import TracebackType
+from typing import Self
+from typing import ClassVar
+from typing import final
+from hashlib import sha256
+from hashlib import file_digest
+from logging import getLogger
+from pathlib import Path
+from sqlite3 import connect
+from dataclasses import dataclass
+from collections.abc import Iterable
+
+
+# Columns of entries, in the order of StateEntry.
+type _Row = tuple[str, str, str, str, int, str, int, str | None, str, int]
+
+
+@final
+@dataclass(slots=True)
+class StateEntry:
+    """Class to describe a path installed.
+
+    Attributes:
+        path(Path): Where the content is created.
+        manifest(str): The name of manifest which owns the path.
+        version(str): The version of manifest when the path is created.
+        type_(str): What is the content.
+        mode(int): st_mode of the path, including the file type.
+        xattr(dict[str, str]): Extended attributes set.
+        size(int): st_size of the path.
+        digest(str | None): The sha256 checksum of a regular file, None otherwise.
+        fingerprint(str): What the content is made from, see PlannedContent.
+        mtime_ns(int): st_mtime_ns of the path.
+    """
+
+    path: Path
+    manifest: str
+    version: str
+    type_: str
+    mode: int
+    xattr: dict[str, str]
+    size: int
+    digest: str | None
+    fingerprint: str
+    mtime_ns: int
+
+    def matches(self, st: stat_result) -> bool:
+        """Check if the path is not changed since recorded.
+
+        Only mode is compared for directories, as their size and mtime
+        change with children.
+        """
+        if st.st_mode != self.mode:
+            return False
+        if S_ISDIR(st.st_mode):
+            return True
+        return st.st_size == self.size and st.st_mtime_ns == self.mtime_ns
+
+    @classmethod
+    def capture(  # noqa: PLR0913
+        cls,
+        path: Path,
+        manifest: str,
+        version: str,
+        type_: str,
+        xattr: dict[str, str],
+        fingerprint: str,
+    ) -> Self:
+        """Record the path as it is now.
+
+        Args:
+            path(Path): Where the content is created.
+            manifest(str): The name of manifest which owns the path.
+            version(str): The version of manifest.
+            type_(str): What is the content.
+            xattr(dict[str, str]): Extended attributes set.
+            fingerprint(str): What the content is made from.
+        """
+        st = path.lstat()
+        digest = None
+        if S_ISREG(st.st_mode):
+            with path.open("rb") as reader:
+                digest = file_digest(reader, sha256).hexdigest()
+        return cls(
+            path,
+            manifest,
+            version,
+            type_,
+            st.st_mode,
+            xattr,
+            st.st_size,
+            digest,
+            fingerprint,
+            st.st_mtime_ns,
+        )
+
+
+@final
+class InstallState:
+    """A sqlite database of paths installed, keyed by path.
+
+    Remarks:
+        A path is owned by the manifest which creates it last,
+        so uninstalling other manifests does not remove it.
+        Use it as a context manager to close the database.
+    """
+
+    SCHEMA_VERSION: ClassVar[int] = 1
+
+    def __init__(self, path: Path):
+        """Open the database at path, it is created if missing."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.__connection = connect(path)
+        with self.__connection:
+            row = self.__connection.execute("PRAGMA user_version").fetchone()  # pyright: ignore[reportAny]
+            version: int = row[0]  # pyright: ignore[reportAny]
+            if version != self.SCHEMA_VERSION:
+                getLogger(__name__).debug("Creating schema of %s...", path)
+                _ = self.__connection.execute("DROP TABLE IF EXISTS entries")
+                _ = self.__connection.execute(
+                    """CREATE TABLE entries (
+                        path TEXT PRIMARY KEY,
+                        manifest TEXT NOT NULL,
+                        version TEXT NOT NULL,
+                        type TEXT NOT NULL,
+                        mode INTEGER NOT NULL,
+                        xattr TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        digest TEXT,
+                        fingerprint TEXT NOT NULL,
+                        mtime_ns INTEGER NOT NULL
+                    )""",
+                )
+                _ = self.__connection.execute(
+                    "CREATE INDEX entries_manifest ON entries (manifest)",
+                )
+                _ = self.__connection.execute(
+                    "PRAGMA user_version = {}".format(self.SCHEMA_VERSION),
+                )
+
+    @classmethod
+    def default_path(cls, waydroid: Path) -> Path:
+        """Get the default path of database under waydroid's data."""
+        return waydroid / "injector/state.db"
+
+    def entries(self, manifest: str) -> dict[Path, StateEntry]:
+        """Get paths owned by manifest."""
+        rows: list[_Row] = self.__connection.execute(
+            "SELECT * FROM entries WHERE manifest = ?",
+            (manifest,),
+        ).fetchall()
+        return {
+            Path(path): StateEntry(
+                Path(path),
+                manifest_,
+                version,
+                type_,
+                mode,
+                loads(xattr),  # pyright: ignore[reportAny]
+                size,
+                digest,
+                fingerprint,
+                mtime_ns,
+            )
+            for (
+                path,
+                manifest_,
+                version,
+                type_,
+                mode,
+                xattr,
+                size,
+                digest,
+                fingerprint,
+                mtime_ns,
+            ) in rows
+        }
+
+    def owner(self, path: Path) -> str | None:
+        """Get the name of manifest which owns path, None if not recorded."""
+        row: tuple[str] | None = self.__connection.execute(  # pyright: ignore[reportAny]
+            "SELECT manifest FROM entries WHERE path = ?",
+            (str(path),),
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def record(self, entries: Iterable[StateEntry]):
+        """Remember entries, replacing old ones at the same paths."""
+        with self.__connection:
+            _ = self.__connection.executemany(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        str(entry.path),
+                        entry.manifest,
+                        entry.version,
+                        entry.type_,
+                        entry.mode,
+                        dumps(entry.xattr),
+                        entry.size,
+                        entry.digest,
+                        entry.fingerprint,
+                        entry.mtime_ns,
+                    )
+                    for entry in entries
+                ),
+            )
+
+    def forget(self, paths: Iterable[Path]):
+        """Forget entries at paths."""
+        with self.__connection:
+            _ = self.__connection.executemany(
+                "DELETE FROM entries WHERE path = ?",
+                ((str(path),) for path in paths),
+            )
+
+    def close(self):
+        """Close the database."""
+        self.__connection.close()
+
+    def __enter__(self) -> Self:
+        """Use the database in a with statement."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ):
+        """Close the database when leaving the with statement."""
+        self.close()
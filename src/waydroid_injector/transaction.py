@@ -0,0 +1,219 @@
+"""Install contents atomically with a staging folder and a journal."""
+
+from os import O_RDONLY
+from os import open as os_open
+from os import close
+from os import fsync
+from os import scandir
+from json import dumps
+from json import loads
+from shutil import rmtree
+from typing import Any
+from typing import Self
+from typing import final
+from logging import getLogger
+from pathlib import Path
+from collections import deque
+from dataclasses import dataclass
+from collections.abc import Iterable
+from collections.abc import Iterator
+from collections.abc import Sequence
+from waydroid_injector.plan import PlannedContent
+from waydroid_injector.xattr import read_xattrs
+from waydroid_injector.xattr import apply_xattrs
+
+
+@final
+@dataclass
+class Transaction:
+    """Class to describe an install staged beside waydroid's data.
+
+    Contents under roots are created in a staging folder beside each root first.
+    When all of them are created, operations moving them into roots are written
+    into the journal, which is the commit point, and then replayed with renames.
+
+    Attributes:
+        journal(Path): Where the write-ahead journal is storaged.
+        roots(list[Path]): Folders whose contents are staged, like overlay.
+
+    Remarks:
+        Use Transaction.recover() before installing, so an interrupted install
+        is rolled forward if its journal is written, or rolled back otherwise.
+        Neither of them scans roots.
+    """
+
+    journal: Path
+    roots: list[Path]
+
+    @staticmethod
+    def staging_of(root: Path) -> Path:
+        """Get the staging folder of root, which is on the same filesystem."""
+        return root.with_name(".{}.staging".format(root.name))
+
+    def stage_path(self, path: Path) -> Path:
+        """Get where to stage path, path itself if it is not under roots."""
+        for root in self.roots:
+            if path.is_relative_to(root):
+                return self.staging_of(root) / path.relative_to(root)
+        return path
+
+    def stage(self, contents: Iterable[PlannedContent]) -> Iterator[PlannedContent]:
+        """Get contents to be created into staging folders instead, as they come.
+
+        Sources created by earlier contents are read from staging folders too.
+
+        Args:
+            contents(Iterable[PlannedContent]): Contents to create, in manifest order.
+        """
+        paths: set[Path] = set()
+        for planned in contents:
+            source = planned.source
+            if (
+                source is not None
+                and planned.content.type_ != "link"
+                and any(p in paths for p in [source, *source.parents])
+            ):
+                source = self.stage_path(source)
+            paths.add(planned.path)
+            yield PlannedContent(planned.content, self.stage_path(planned.path), source)
+
+    def commit(self, contents: Sequence[PlannedContent]):
+        """Move staged contents into roots.
+
+        Args:
+            contents(Sequence[PlannedContent]): Contents created, as returned by
+            Transaction.stage(). Metadata of directories among them are applied
+            to existing directories, other existing directories are kept as is.
+        """
+        owned = {
+            planned.path for planned in contents if planned.content.type_ == "directory"
+        }
+        copied = {planned.path for planned in contents if planned.source is not None}
+        operations: list[list[str]] = []
+        for root in self.roots:
+            staging = self.staging_of(root)
+            if staging.is_dir():
+                operations.extend(self.__operations(staging, root, owned, copied))
+        self.__write_journal(operations)
+        self.__replay(operations)
+
+    def rollback(self):
+        """Drop staged contents which are not committed."""
+        logger = getLogger(__name__)
+        for root in self.roots:
+            staging = self.staging_of(root)
+            if staging.exists(follow_symlinks=False):
+                logger.info("Rolling back staged contents in %s...", staging)
+                rmtree(staging)
+
+    def recover(self):
+        """Finish or drop an interrupted install."""
+        logger = getLogger(__name__)
+        data = self.__load_journal()
+        if data is None:
+            self.rollback()
+            return
+        logger.info("Rolling forward interrupted install with %s...", self.journal)
+        operations: list[list[str]] = data.get("operations", [])  # pyright: ignore[reportAny]
+        self.__replay(operations)
+
+    @staticmethod
+    def __operations(
+        staging: Path,
+        root: Path,
+        owned: set[Path],
+        copied: set[Path],
+    ) -> list[list[str]]:
+        """Walk staging from top to bottom and get operations to move it."""
+        operations: list[list[str]] = []
+        pending = deque([(staging, root, False)])
+        while len(pending) > 0:
+            staged_dir, target_dir, in_copied = pending.popleft()
+            with scandir(staged_dir) as it:
+                for entry in it:
+                    staged = Path(entry.path)
+                    target = target_dir / entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        kind = "directory" if in_copied or staged in owned else "parent"
+                        operations.append([kind, str(staged), str(target)])
+                        pending.append((staged, target, in_copied or staged in copied))
+                    else:
+                        operations.append(["file", str(staged), str(target)])
+        return operations
+
+    def __write_journal(self, operations: list[list[str]]):
+        """Write the journal durably, it is atomic with a rename."""
+        self.journal.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.journal.with_name(self.journal.name + ".tmp")
+        with tmp.open("w") as writer:
+            _ = writer.write(dumps({"operations": operations}))
+            writer.flush()
+            fsync(writer.fileno())
+        _ = tmp.replace(self.journal)
+        fd = os_open(self.journal.parent, O_RDONLY)
+        try:
+            fsync(fd)
+        finally:
+            close(fd)
+
+    def __load_journal(self) -> dict[str, Any] | None:
+        try:
+            data: object = loads(self.journal.read_text())  # pyright: ignore[reportAny]
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            getLogger(__name__).warning("Ignoring broken journal %s.", self.journal)
+            self.journal.unlink()
+            return None
+        return data if isinstance(data, dict) else None  # pyright: ignore[reportUnknownVariableType]
+
+    def __replay(self, operations: list[list[str]]):
+        """Apply operations, which is safe to be run again after interrupted.
+
+        Failed operations are logged and skipped, and the first error is raised
+        at last. The journal and staging folders are kept when any fails,
+        so Transaction.recover() finishes them later.
+        """
+        logger = getLogger(__name__)
+        errors: list[OSError] = []
+        for root in self.roots:
+            if self.staging_of(root).exists(follow_symlinks=False):
+                root.mkdir(parents=True, exist_ok=True)
+        for kind, staged_str, target_str in operations:
+            staged = Path(staged_str)
+            target = Path(target_str)
+            if not staged.exists(follow_symlinks=False):
+                # Moved already, with its parent or by an interrupted replay.
+                continue
+            try:
+                self.__apply(kind, staged, target)
+            except OSError as e:
+                logger.error("Failed to move %s to %s: %s", staged, target, e)
+                errors.append(e)
+        if len(errors) > 0:
+            logger.error("Keeping %s to finish the install later.", self.journal)
+            raise errors[0]
+        for root in self.roots:
+            staging = self.staging_of(root)
+            if staging.exists(follow_symlinks=False):
+                rmtree(staging)
+        self.journal.unlink(missing_ok=True)
+
+    @staticmethod
+    def __apply(kind: str, staged: Path, target: Path):
+        logger = getLogger(__name__)
+        if kind == "file":
+            logger.debug("Moving %s to %s...", staged, target)
+            _ = staged.replace(target)
+        elif not target.exists(follow_symlinks=False):
+            logger.debug("Moving %s to %s...", staged, target)
+            _ = staged.rename(target)
+        elif kind == "directory" and not target.is_symlink():
+            logger.debug("Applying metadata of %s to %s...", staged, target)
+            target.chmod(staged.stat().st_mode & 0o7777)
+            _ = apply_xattrs(target, read_xattrs(staged))
+
+    @classmethod
+    def for_roots(cls, injector: Path, roots: Sequence[Path]) -> Self:
+        """Create a transaction with the default journal under injector folder."""
+        return cls(injector / "journal.json", list(roots))
@@ -0,0 +1,56 @@
+"""Rules to set metadata of entries mirrored by a tree content."""
+
+from typing import Any
+from typing import Self
+from typing import final
+from typing import override
+from fnmatch import fnmatchcase
+from dataclasses import field
+from dataclasses import dataclass
+from collections.abc import Mapping
+from waydroid_injector.xattr import EMPTY_XATTR
+from waydroid_injector.deserializable import Deserializable
+
+
+@final
+@dataclass(slots=True)
+class TreeRule(Deserializable):
+    """Class to describe metadata of entries matching a pattern.
+
+    Attributes:
+        pattern(str): The glob pattern of paths relative to the tree,
+        like `bin/*` or `*.so`. `*` also matches `/`.
+
+        mode(int | None): Override mode of matching entries.
+        Defaults to None, which keeps the mode of source.
+
+        xattr(Mapping[str, str]): Extended attributes to set on matching entries.
+        Defaults to EMPTY_XATTR.
+
+    Remarks:
+        All rules matching an entry are applied in order,
+        so later rules override earlier ones.
+    """
+
+    pattern: str
+    mode: int | None = None
+    xattr: Mapping[str, str] = field(default_factory=lambda: EMPTY_XATTR)
+
+    def matches(self, relative: str) -> bool:
+        """Check if the entry at relative path matches the pattern."""
+        return fnmatchcase(relative, self.pattern)
+
+    @property
+    @override
+    def valid(self) -> bool:
+        return self.pattern != ""
+
+    @classmethod
+    @override
+    def load(cls, data: dict[str, Any]) -> Self:
+        pattern: str | None = data.get("pattern")
+        if pattern is None:
+            raise ValueError("TreeRule.pattern should not be None.")
+        mode: int | None = data.get("mode")
+        xattr: Mapping[str, str] = data.get("xattr", EMPTY_XATTR)
+        return cls(pattern, mode, xattr)
@@ -2,9 +2,19 @@
 
 from typing import Literal
 from typing import Callable
+from typing import Concatenate
 from pathlib import Path
 
 
-type ContentType = Literal["directory", "file", "link"]
-type CompressType = Literal["gz"]
-type EntrypointFunctionType = Callable[[bool, Path], None]
+type ContentType = Literal["directory", "file", "link", "tree"]
+type CompressType = Literal["gz", "bz2", "xz", "zstd"]
+type SkipMode = Literal["stat", "digest"]
+type CloneStrategy = Literal[
+    "reflink",
+    "hardlink",
+    "sparse",
+    "copy_file_range",
+    "sendfile",
+    "copy",
+]
+type EntrypointFunctionType = Callable[Concatenate[bool, Path, ...], None]
@@ -0,0 +1,296 @@
+"""Find problems of a manifest without touching the filesystem."""
+
+from typing import final
+from pathlib import Path
+from pathlib import PurePath
+from pathlib import PurePosixPath
+from dataclasses import field
+from dataclasses import dataclass
+from collections.abc import Iterable
+from collections.abc import Sequence
+from waydroid_injector.source import Source
+from waydroid_injector.content import Content
+from waydroid_injector.extract import Extract
+from waydroid_injector.type_defines import ContentType
+
+
+# Variables are formatted as themselves, so paths keep them as their roots.
+_OVERLAY = Path("{overlay}")
+_OVERLAY_RW = Path("{overlay_rw}")
+_USER_DATA = Path("{user_data}")
+_SRCDIR = Path("{srcdir}")
+
+
+@final
+@dataclass(slots=True)
+class Problem:
+    """Class to describe a problem found in manifest.
+
+    Attributes:
+        message(str): What is wrong.
+        fatal(bool): If the manifest can not be installed as expected.
+        Defaults to True.
+    """
+
+    message: str
+    fatal: bool = True
+
+
+@final
+@dataclass(slots=True)
+class _Node:
+    """Class to describe a path in PathTrie.
+
+    Attributes:
+        children(dict[str, _Node]): Paths under it, keyed by their names.
+        index(int | None): The last content at the path.
+        type_(ContentType | None): What is the last content at the path.
+        below(int | None): The first content under the path.
+    """
+
+    children: dict[str, "_Node"] = field(default_factory=dict)
+    index: int | None = None
+    type_: ContentType | None = None
+    below: int | None = None
+
+
+@final
+class PathTrie:
+    """A trie of paths of contents, keyed by their parts.
+
+    Inserting a path visits each of its parts once, so indexing
+    a manifest is linear in the total length of its paths.
+    """
+
+    __slots__ = ("__root",)
+
+    def __init__(self):
+        """Initialize an empty trie."""
+        self.__root = _Node()
+
+    def insert(self, path: PurePath, index: int, type_: ContentType) -> list[Problem]:
+        """Index content at path, and get conflicts with contents indexed.
+
+        Args:
+            path(PurePath): Where to create the content.
+            index(int): The index of content in manifest.
+            type_(ContentType): What is the content.
+        """
+        problems: list[Problem] = []
+        node = self.__root
+        for part in path.parts:
+            if node.index is not None and node.type_ in ("file", "link"):
+                problems.append(
+                    Problem(
+                        "contents[{}] is under {} contents[{}].".format(
+                            index,
+                            node.type_,
+                            node.index,
+                        ),
+                        node.type_ == "file",
+                    ),
+                )
+            if node.below is None:
+                node.below = index
+            node = node.children.setdefault(part, _Node())
+
+        if node.index is not None:
+            same = {node.type_, type_} <= {"directory", "tree"} or node.type_ == type_
+            problems.append(
+                Problem(
+                    "contents[{}] overrides {} contents[{}] at {}.".format(
+                        index,
+                        node.type_,
+                        node.index,
+                        path,
+                    ),
+                    not same,
+                ),
+            )
+        if node.below is not None and type_ in ("file", "link"):
+            problems.append(
+                Problem(
+                    "contents[{}] is a {} but contents[{}] is under it.".format(
+                        index,
+                        type_,
+                        node.below,
+                    ),
+                ),
+            )
+        node.index = index
+        node.type_ = type_
+        return problems
+
+
+@final
+class Validator:
+    """Find problems of a manifest one content at a time, see validate().
+
+    Attributes:
+        problems(list[Problem]): Problems of name, version and sources,
+        found when initialized.
+    """
+
+    __slots__ = (
+        "problems",
+        "__name",
+        "__version",
+        "__file_names",
+        "__extracts",
+        "__opaque",
+        "__trie",
+        "__count",
+    )
+
+    def __init__(self, name: str, version: str, sources: Sequence[Source]):
+        """Find problems of the manifest except its contents.
+
+        Args:
+            name(str): The name of manifest.
+            version(str): The version of manifest.
+            sources(Sequence[Source]): Sources of manifest.
+        """
+        self.problems: list[Problem] = []
+        if name == "":
+            self.problems.append(Problem("Manifest.name should not be empty."))
+        if version == "":
+            self.problems.append(Problem("Manifest.version should not be empty."))
+        self.__name = name
+        self.__version = version
+        self.__file_names = _file_names(name, version, sources, self.problems)
+        builds = [source.build for source in sources if source.build is not None]
+        self.__extracts = [i.extract for i in builds if i.extract is not None]
+        # Outputs of commands and scripts are only known after building.
+        self.__opaque = any(len(i.cmd) > 0 or i.shell is not None for i in builds)
+        self.__trie = PathTrie()
+        self.__count = 0
+
+    def add(self, content: Content) -> list[Problem]:
+        """Find problems of the next content, in manifest order."""
+        index = self.__count
+        self.__count += 1
+        problems: list[Problem] = []
+        try:
+            path = content.get_path(_OVERLAY, _OVERLAY_RW, _USER_DATA)
+            source = content.get_source(
+                _SRCDIR,
+                self.__name,
+                self.__version,
+                _OVERLAY,
+                _OVERLAY_RW,
+                _USER_DATA,
+            )
+        except (KeyError, IndexError, ValueError) as e:
+            problems.append(
+                Problem("contents[{}] has an unknown variable {}.".format(index, e)),
+            )
+            return problems
+        problems.extend(self.__trie.insert(path, index, content.type_))
+        if not content.valid:
+            problems.append(_invalid(index, content))
+        if (
+            source is not None
+            and content.type_ != "link"
+            and not self.__opaque
+            and source.is_relative_to(_SRCDIR)
+            and not _produced(
+                source.relative_to(_SRCDIR),
+                self.__file_names,
+                self.__extracts,
+            )
+        ):
+            problems.append(
+                Problem(
+                    "contents[{}] reads {} which no source produces.".format(
+                        index,
+                        source,
+                    ),
+                ),
+            )
+        return problems
+
+    def finish(self) -> list[Problem]:
+        """Find problems left after all contents are added."""
+        if self.__count == 0:
+            return [Problem("Manifest.contents should not be empty.")]
+        return []
+
+
+def validate(
+    name: str,
+    version: str,
+    sources: Sequence[Source],
+    contents: Iterable[Content],
+) -> list[Problem]:
+    """Find problems of a manifest, without touching the filesystem.
+
+    Paths are checked with variables unformatted, duplicate paths and paths
+    under files or links are reported, and so are sources under {srcdir}
+    which no source produces. Extracted paths are known from include of
+    extract, but sources are not checked if any build runs cmd or shell.
+
+    Args:
+        name(str): The name of manifest.
+        version(str): The version of manifest.
+        sources(Sequence[Source]): Sources of manifest.
+        contents(Iterable[Content]): Contents of manifest, in manifest order.
+    """
+    validator = Validator(name, version, sources)
+    problems = list(validator.problems)
+    for content in contents:
+        problems.extend(validator.add(content))
+    problems.extend(validator.finish())
+    return problems
+
+
+def _file_names(
+    name: str,
+    version: str,
+    sources: Sequence[Source],
+    problems: list[Problem],
+) -> dict[str, int]:
+    """Get names of files obtained under srcdir, with the index of their sources."""
+    file_names: dict[str, int] = {}
+    for index, source in enumerate(sources):
+        try:
+            file_name = source.get_file_name(name, version)
+        except (KeyError, IndexError, ValueError) as e:
+            problems.append(
+                Problem("sources[{}] has no proper file name: {}".format(index, e)),
+            )
+            continue
+        if file_name in file_names:
+            problems.append(
+                Problem(
+                    "sources[{}] and sources[{}] are both saved as {}.".format(
+                        file_names[file_name],
+                        index,
+                        file_name,
+                    ),
+                ),
+            )
+        file_names[file_name] = index
+    return file_names
+
+
+def _produced(
+    relative: Path,
+    file_names: dict[str, int],
+    extracts: list[Extract],
+) -> bool:
+    """Check if the path relative to srcdir is obtained or extracted."""
+    return (
+        len(relative.parts) == 0
+        or relative.parts[0] in file_names
+        or any(i.produces(PurePosixPath(relative)) for i in extracts)
+    )
+
+
+def _invalid(index: int, content: Content) -> Problem:
+    """Describe a content which is not valid."""
+    if content.type_ == "file":
+        return Problem(
+            "contents[{}] has neither content nor source, it is empty.".format(index),
+            False,
+        )
+    return Problem("contents[{}] is a {} without source.".format(index, content.type_))
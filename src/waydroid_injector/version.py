@@ -0,0 +1,3 @@
+"""The version of waydroid_injector, kept free of imports."""
+
+__version__ = "0.2.1"
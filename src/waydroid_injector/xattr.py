@@ -0,0 +1,62 @@
+"""Read and write extended attributes with few syscalls."""
+
+from os import getxattr
+from os import setxattr
+from os import listxattr
+from types import MappingProxyType
+from typing import Final
+from logging import getLogger
+from pathlib import Path
+from collections.abc import Mapping
+
+
+EMPTY_XATTR: Final[Mapping[str, str]] = MappingProxyType({})
+"""Shared by everything without extended attributes to set."""
+
+
+def read_xattrs(path: Path) -> dict[str, bytes]:
+    """Read all extended attributes of path, symbolic links are not followed."""
+    return {
+        key: getxattr(path, key, follow_symlinks=False)
+        for key in listxattr(path, follow_symlinks=False)
+    }
+
+
+def diff_xattrs(path: Path, values: Mapping[str, bytes]) -> dict[str, bytes]:
+    """Get values which are different from extended attributes of path.
+
+    Names are listed once, and only keys present are read to be compared.
+
+    Args:
+        path(Path): The path to compare, symbolic links are not followed.
+        values(Mapping[str, bytes]): Extended attributes wanted.
+    """
+    if len(values) == 0:
+        return {}
+    names = set(listxattr(path, follow_symlinks=False))
+    return {
+        key: value
+        for key, value in values.items()
+        if key not in names or getxattr(path, key, follow_symlinks=False) != value
+    }
+
+
+def apply_xattrs(path: Path, values: Mapping[str, bytes]) -> int:
+    """Set extended attributes of path which are different from values.
+
+    Attributes are created or replaced as needed, so no flag is chosen
+    from names which may be outdated.
+
+    Args:
+        path(Path): The path to change, symbolic links are not followed.
+        values(Mapping[str, bytes]): Extended attributes wanted.
+
+    Returns:
+        int: How many attributes are written.
+    """
+    logger = getLogger(__name__)
+    diff = diff_xattrs(path, values)
+    for key, value in diff.items():
+        logger.debug("Setting xattr %s=%s", key, value)
+        setxattr(path, key, value, follow_symlinks=False)
+    return len(diff)
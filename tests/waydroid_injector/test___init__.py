@@ -10,6 +10,7 @@ from logging import INFO
 from logging import DEBUG
 from logging import getLogger
 from pathlib import Path
+from waydroid_injector import main
 from waydroid_injector import setup_logger
 from waydroid_injector import is_entrypoint
 
@@ -106,3 +107,19 @@ def test_setup_logger(debug: bool, level: int):
     logger = getLogger("waydroid_injector.test")
     setup_logger(logger, debug)
     assert logger.level == level
+
+
+def test_main_validate(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """Test main function validates without the compiled cache."""
+    manifest = tmp_path / "manifest.toml"
+    _ = manifest.write_text(
+        'name = "test"\nversion = "1.0"\n\n'
+        '[[contents]]\npath = "{overlay}/a"\ntype = "file"\ncontent = "a"\n',
+    )
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(
+        "sys.argv",
+        ["waydroid_injector", "-d", "validate", "manifest.toml"],
+    )
+    main()
+    assert not (tmp_path / "slash").exists()
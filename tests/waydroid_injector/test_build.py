@@ -6,6 +6,7 @@ import pytest
 from typing import Any
 from typing import ClassVar
 from pathlib import Path
+from zipfile import ZipFile
 from waydroid_injector.build import Build
 
 
@@ -14,6 +15,7 @@ class TestBuild:
 
     _VALID_BUILD_CMD_JSON: ClassVar[dict[str, list[str]]] = {"cmd": ["ls", "-l"]}
     _VALID_BUILD_SHELL_JSON: ClassVar[dict[str, str]] = {"shell": "ls -l"}
+    _VALID_BUILD_EXTRACT_JSON: ClassVar[dict[str, bool]] = {"extract": True}
     _INVALID_BUILD_JSON: ClassVar[dict[str, Any]] = {}
 
     def test_build(self, tmp_path: Path):
@@ -21,11 +23,21 @@ class TestBuild:
         build = Build.load(self._VALID_BUILD_CMD_JSON)
         build.build(tmp_path, "pytest")
 
+    def test_build_extract(self, tmp_path: Path):
+        """Test Build.build function with extract."""
+        _ = (tmp_path / "test").write_text("test")
+        with ZipFile(tmp_path / "test.zip", "w") as writer:
+            writer.write(tmp_path / "test", "extracted")
+        build = Build.load(self._VALID_BUILD_EXTRACT_JSON)
+        build.build(tmp_path, "test.zip")
+        assert (tmp_path / "extracted").read_text() == "test"
+
     @pytest.mark.parametrize(
         ("data", "valid"),
         [
             (_VALID_BUILD_CMD_JSON, True),
             (_VALID_BUILD_SHELL_JSON, True),
+            (_VALID_BUILD_EXTRACT_JSON, True),
             (_INVALID_BUILD_JSON, False),
         ],
     )
@@ -0,0 +1,67 @@
+"""Test src/waydroid_injector/cache.py."""
+
+from os import utime
+from pathlib import Path
+from waydroid_injector.cache import Cache
+
+
+class TestCache:
+    """Test Cache class."""
+
+    def test_get(self, tmp_path: Path):
+        """Test Cache.get function."""
+        cache = Cache(tmp_path / "cache")
+        src = tmp_path / "src"
+        _ = src.write_text("test")
+        dst = tmp_path / "dst"
+        assert not cache.get("test", dst)
+        cache.put("test", src)
+        assert cache.get("test", dst)
+        assert dst.read_text() == "test"
+
+    def test_get_copy(self, tmp_path: Path):
+        """Test Cache.get function keeps cache intact without allow_hardlink."""
+        cache = Cache(tmp_path / "cache")
+        src = tmp_path / "src"
+        _ = src.write_text("test")
+        dst = tmp_path / "dst"
+        cache.put("test", src)
+        _ = src.write_text("modified")
+        assert cache.get("test", dst)
+        _ = dst.write_text("modified")
+        assert (cache.root / "test").read_text() == "test"
+
+    def test_entries(self, tmp_path: Path):
+        """Test Cache.entries function."""
+        cache = Cache(tmp_path / "cache")
+        for sha256, last_used in [("old", 1), ("new", 2)]:
+            src = tmp_path / sha256
+            _ = src.write_text(sha256)
+            cache.put(sha256, src)
+            utime(cache.root / sha256, (last_used, last_used))
+        entries = cache.entries()
+        assert [entry.sha256 for entry in entries] == ["new", "old"]
+        assert [entry.size for entry in entries] == [3, 3]
+
+    def test_prune(self, tmp_path: Path):
+        """Test Cache.prune function."""
+        cache = Cache(tmp_path / "cache", None)
+        for sha256, last_used in [("old", 1), ("new", 2)]:
+            src = tmp_path / sha256
+            _ = src.write_text(sha256)
+            cache.put(sha256, src)
+            utime(cache.root / sha256, (last_used, last_used))
+        evicted = cache.prune(3)
+        assert [entry.sha256 for entry in evicted] == ["old"]
+        assert [entry.sha256 for entry in cache.entries()] == ["new"]
+        _ = cache.prune(0)
+        assert cache.entries() == []
+
+    def test_put_max_size(self, tmp_path: Path):
+        """Test Cache.put function evicts sources exceeding max_size."""
+        cache = Cache(tmp_path / "cache", 4)
+        src = tmp_path / "src"
+        _ = src.write_text("test")
+        cache.put("a", src)
+        cache.put("b", src)
+        assert len(cache.entries()) == 1
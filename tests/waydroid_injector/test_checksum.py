@@ -4,7 +4,11 @@ import pytest
 from os import urandom
 from typing import Any
 from typing import ClassVar
+from hashlib import new
 from hashlib import sha256
+from pathlib import Path
+from waydroid_injector.memo import DigestMemo
+from waydroid_injector.checksum import Hasher
 from waydroid_injector.checksum import Checksum
 
 
@@ -14,6 +18,9 @@ class TestChecksum:
     _VALID_CHECKSUM_JSON: ClassVar[dict[str, str | None]] = {
         "sha256": "example-sha-256",
     }
+    _VALID_CHECKSUM_MD5_JSON: ClassVar[dict[str, str | None]] = {
+        "md5": "example-md5",
+    }
     _INVALID_CHECKSUM_NONE_JSON: ClassVar[dict[str, str | None]] = {"sha256": None}
     _INVALID_CHECKSUM_EMPTY_JSON: ClassVar[dict[str, str | None]] = {}
 
@@ -25,10 +32,55 @@ class TestChecksum:
         checksum = Checksum.load({"sha256": hexdigest})
         assert checksum.check(content)
 
+    def test_check_algorithms(self):
+        """Test Checksum.check function with all algorithms."""
+        content = urandom(42)
+        algorithms = ["sha256", "sha512", "blake2b", "sha1", "md5"]
+        data = {key: new(key, content).hexdigest().upper() for key in algorithms}
+        checksum = Checksum.load(data)
+        assert checksum.digests.keys() == set(algorithms)
+        assert checksum.check(content)
+        data["md5"] = data["sha1"]
+        assert not Checksum.load(data).check(content)
+
+    def test_check_file(self, tmp_path: Path):
+        """Test Checksum.check_file function."""
+        content = urandom(Hasher.CHUNK_SIZE * 2 + 42)
+        p = tmp_path / "content"
+        _ = p.write_bytes(content)
+        checksum = Checksum.load({"sha256": sha256(content).hexdigest()})
+        assert checksum.check_file(p)
+        _ = p.write_bytes(content[:-1])
+        assert not checksum.check_file(p)
+
+    def test_check_file_memo(self, tmp_path: Path):
+        """Test Checksum.check_file function with DigestMemo."""
+        content = urandom(42)
+        p = tmp_path / "content"
+        _ = p.write_bytes(content)
+        checksum = Checksum.load({"sha256": sha256(content).hexdigest()})
+        memo = DigestMemo(tmp_path / "memo.json")
+        assert checksum.check_file(p, memo)
+        assert memo.lookup(p.stat()) == checksum.digests
+        memo.store(p.stat(), {"sha256": "remembered"})
+        assert not checksum.check_file(p, memo)
+        assert checksum.check_file(p, DigestMemo(memo.path))
+
+    def test_hasher(self):
+        """Test Checksum.hasher function."""
+        content = urandom(42)
+        checksum = Checksum.load({"sha256": sha256(content).hexdigest()})
+        hasher = checksum.hasher()
+        hasher.update(content[:21])
+        assert not hasher.match
+        hasher.update(content[21:])
+        assert hasher.match
+
     @pytest.mark.parametrize(
         ("data", "valid"),
         [
             (_VALID_CHECKSUM_JSON, True),
+            (_VALID_CHECKSUM_MD5_JSON, True),
             (_INVALID_CHECKSUM_EMPTY_JSON, False),
             (_INVALID_CHECKSUM_NONE_JSON, False),
         ],
@@ -0,0 +1,85 @@
+"""Test src/waydroid_injector/clone.py."""
+
+import pytest
+from os import urandom
+from pathlib import Path
+from waydroid_injector import clone
+from waydroid_injector.clone import clone_file
+from waydroid_injector.clone import clone_tree
+
+
+@pytest.mark.parametrize("allow_hardlink", [True, False])
+def test_clone_file(tmp_path: Path, allow_hardlink: bool):
+    """Test clone_file function."""
+    content = urandom(42)
+    src = tmp_path / "src"
+    _ = src.write_bytes(content)
+    mode = 0o755
+    src.chmod(mode)
+    dst = tmp_path / "dst"
+    _ = dst.write_text("exists")
+    strategy = clone_file(src, dst, allow_hardlink)
+    assert dst.read_bytes() == content
+    assert dst.stat().st_mode & 0o777 == mode
+    assert dst.stat().st_mtime_ns == src.stat().st_mtime_ns
+    hardlinked = dst.stat().st_ino == src.stat().st_ino
+    assert hardlinked == (strategy == "hardlink")
+    if not allow_hardlink:
+        assert strategy != "hardlink"
+
+
+def test_clone_file_sparse(tmp_path: Path):
+    """Test clone_file function keeps holes of sparse files."""
+    size = 16 * 1024 * 1024
+    content = urandom(42)
+    src = tmp_path / "src"
+    with src.open("wb") as writer:
+        _ = writer.seek(size // 2)
+        _ = writer.write(content)
+        _ = writer.truncate(size)
+    dst = tmp_path / "dst"
+    strategy = clone_file(src, dst)
+    with dst.open("rb") as reader:
+        _ = reader.seek(size // 2)
+        assert reader.read(len(content)) == content
+    assert dst.stat().st_size == size
+    if strategy == "sparse":
+        assert dst.stat().st_blocks < src.stat().st_size // 512
+
+
+@pytest.mark.parametrize(
+    "broken",
+    [["copy_file_range"], ["copy_file_range", "sendfile"]],
+)
+def test_clone_file_short(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    broken: list[str],
+):
+    """Test clone_file function falls back when kernel stops copying early."""
+    for name in broken:
+        monkeypatch.setattr(clone, name, lambda *_: 0)
+    monkeypatch.setattr(clone, "_reflink", lambda *_: False)
+    content = urandom(42)
+    src = tmp_path / "src"
+    _ = src.write_bytes(content)
+    dst = tmp_path / "dst"
+    strategy = clone_file(src, dst)
+    assert dst.read_bytes() == content
+    assert strategy not in broken
+
+
+def test_clone_tree(tmp_path: Path):
+    """Test clone_tree function."""
+    src = tmp_path / "src"
+    (src / "a/b").mkdir(parents=True)
+    _ = (src / "a/b/c").write_text("c")
+    _ = (src / "d").write_text("d")
+    (src / "a").chmod(0o700)
+    dst = tmp_path / "dst"
+    (dst / "a").mkdir(parents=True)
+    _ = (dst / "d").write_text("exists")
+    clone_tree(src, dst, 2)
+    assert (dst / "a/b/c").read_text() == "c"
+    assert (dst / "d").read_text() == "d"
+    assert (dst / "a").stat().st_mode & 0o777 == (src / "a").stat().st_mode & 0o777
@@ -0,0 +1,84 @@
+"""Test src/waydroid_injector/compiled.py."""
+
+import pytest
+from typing import Any
+from pathlib import Path
+from waydroid_injector.xattr import EMPTY_XATTR
+from waydroid_injector.compiled import CompiledCache
+from waydroid_injector.manifest import Manifest
+
+
+_MANIFEST = """
+name = "test"
+version = "1.0"
+
+[[contents]]
+path = "{overlay}/test"
+type = "file"
+content = "test"
+"""
+
+
+class TestCompiledCache:
+    """Test CompiledCache class."""
+
+    def test_load(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+        """Test CompiledCache.load function skips parsing on hits."""
+        path = tmp_path / "manifest.toml"
+        _ = path.write_text(_MANIFEST)
+        cache = CompiledCache(tmp_path / "compiled")
+        manifest = cache.load(path)
+        assert len(list(cache.root.iterdir())) == 1
+
+        def load(_: dict[str, Any]) -> Manifest:
+            raise AssertionError("Manifest is parsed again.")
+
+        with monkeypatch.context() as m:
+            m.setattr(Manifest, "load", load)
+            cached = cache.load(path)
+        assert cached == manifest
+        assert cached.contents[0].xattr is EMPTY_XATTR
+
+        _ = path.write_text(_MANIFEST.replace("1.0", "2.0"))
+        assert cache.load(path).version == "2.0"
+        assert len(list(cache.root.iterdir())) == 1
+
+    def test_load_broken(self, tmp_path: Path):
+        """Test CompiledCache.load function ignores broken entries."""
+        path = tmp_path / "manifest.toml"
+        _ = path.write_text(_MANIFEST)
+        cache = CompiledCache(tmp_path / "compiled")
+        manifest = cache.load(path)
+        for entry in cache.root.iterdir():
+            _ = entry.write_bytes(b"broken")
+        assert cache.load(path) == manifest
+
+    @pytest.mark.parametrize("writable", ["root", "entry"])
+    def test_load_untrusted(
+        self,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+        writable: str,
+    ):
+        """Test CompiledCache.load function ignores entries others may write."""
+        path = tmp_path / "manifest.toml"
+        _ = path.write_text(_MANIFEST)
+        cache = CompiledCache(tmp_path / "compiled")
+        manifest = cache.load(path)
+        entry = next(cache.root.iterdir())
+        (cache.root if writable == "root" else entry).chmod(0o777)
+        mtime = entry.stat().st_mtime_ns
+        parsed: list[dict[str, Any]] = []
+        load = Manifest.load
+
+        def counted(data: dict[str, Any]) -> Manifest:
+            parsed.append(data)
+            return load(data)
+
+        monkeypatch.setattr(Manifest, "load", counted)
+        assert cache.load(path) == manifest
+        assert len(parsed) == 1
+        if writable == "root":
+            assert entry.stat().st_mtime_ns == mtime
+        else:
+            assert entry.stat().st_mode & 0o077 == 0
@@ -0,0 +1,53 @@
+"""Test src/waydroid_injector/compress.py."""
+
+import pytest
+from os import urandom
+from bz2 import decompress as bz2_decompress
+from gzip import decompress as gzip_decompress
+from lzma import decompress as lzma_decompress
+from pathlib import Path
+from collections.abc import Callable
+from waydroid_injector.compress import Compressor
+from waydroid_injector.type_defines import CompressType
+
+
+class TestCompressor:
+    """Test Compressor class."""
+
+    @pytest.mark.parametrize(
+        ("compress", "decompress"),
+        [
+            ("gz", gzip_decompress),
+            ("bz2", bz2_decompress),
+            ("xz", lzma_decompress),
+        ],
+    )
+    @pytest.mark.parametrize("size", [0, 10, 100])
+    def test_compress(
+        self,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+        compress: CompressType,
+        decompress: Callable[[bytes], bytes],
+        size: int,
+    ):
+        """Test Compressor.compress function writes concatenated members."""
+        monkeypatch.setattr(Compressor, "BLOCK_SIZE", 16)
+        data = urandom(size)
+        dst = tmp_path / "dst"
+        Compressor(compress, 1, 2).compress_bytes(data, dst)
+        assert decompress(dst.read_bytes()) == data
+
+    def test_compress_deterministic(self, tmp_path: Path):
+        """Test Compressor.compress function writes the same gzip for same data."""
+        data = urandom(42)
+        a = tmp_path / "a"
+        b = tmp_path / "b"
+        Compressor("gz").compress_bytes(data, a)
+        Compressor("gz").compress_bytes(data, b)
+        assert a.read_bytes() == b.read_bytes()
+
+    def test_invalid_level(self):
+        """Test Compressor raises with invalid level."""
+        with pytest.raises(ValueError, match="not a valid level"):
+            _ = Compressor("bz2", 0)
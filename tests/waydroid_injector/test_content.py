@@ -3,10 +3,12 @@
 # pyright: reportAny=false
 
 import pytest
+from gzip import decompress
 from typing import Any
 from typing import ClassVar
 from pathlib import Path
 from waydroid_injector.content import Content
+from waydroid_injector.type_defines import SkipMode
 
 
 class TestContent:
@@ -27,6 +29,17 @@ class TestContent:
         "path": "{overlay}/test",
         "type": "file",
     }
+    _INVALID_CONTENT_JSON_COMPRESS_LEVEL: ClassVar[dict[str, Any]] = {
+        "path": "{overlay}/test",
+        "type": "file",
+        "content": "test",
+        "compress": "gz",
+        "compress-level": 10,
+    }
+    _INVALID_CONTENT_JSON_TREE_MISSING_SOURCE: ClassVar[dict[str, Any]] = {
+        "path": "{overlay}/test",
+        "type": "tree",
+    }
     _INVALID_CONTENT_JSON_NONE: ClassVar[dict[str, Any]] = {}
     _INVALID_CONTENT_JSON_MISSING_PATH: ClassVar[dict[str, Any]] = {"type": "file"}
     _INVALID_CONTENT_JSON_MISSING_TYPE: ClassVar[dict[str, Any]] = {
@@ -65,6 +78,79 @@ class TestContent:
         assert p.exists()
         assert p.stat().st_mode & 0o777 == content.mode
 
+    @pytest.mark.parametrize("skip_unchanged", ["stat", "digest"])
+    def test_is_unchanged(self, tmp_path: Path, skip_unchanged: SkipMode):
+        """Test Content.is_unchanged function."""
+        src = tmp_path / "src"
+        _ = src.write_text("test")
+        dst = tmp_path / "dst"
+        content = Content("{overlay}/dst", "file", 0o600, "{srcdir}/src")
+        assert not content.is_unchanged(dst, src, skip_unchanged)
+        content.create_at(dst, src)
+        assert content.is_unchanged(dst, src, skip_unchanged)
+        dst.chmod(0o644)
+        assert content.is_unchanged(dst, src, skip_unchanged)
+        content.repair(dst)
+        assert dst.stat().st_mode & 0o777 == content.mode
+        _ = src.write_text("changed")
+        assert not content.is_unchanged(dst, src, skip_unchanged)
+
+    def test_create_at_compress_source(self, tmp_path: Path):
+        """Test Content.create_at function compresses source."""
+        src = tmp_path / "src"
+        _ = src.write_text("test")
+        dst = tmp_path / "dst.gz"
+        content = Content.load(
+            {
+                "path": "{overlay}/dst.gz",
+                "type": "file",
+                "source": "{srcdir}/src",
+                "compress": "gz",
+                "compress-level": 1,
+            },
+        )
+        content.create_at(dst, src)
+        assert decompress(dst.read_bytes()) == b"test"
+
+    def test_expand(self, tmp_path: Path):
+        """Test Content.expand function mirrors source of tree."""
+        src = tmp_path / "src"
+        (src / "bin").mkdir(parents=True)
+        _ = (src / "bin/a").write_text("a")
+        _ = (src / "b").write_text("b")
+        (src / "b").chmod(0o600)
+        (src / "link").symlink_to("b")
+        content = Content.load(
+            {
+                "path": "{overlay}/system",
+                "type": "tree",
+                "source": "{srcdir}",
+                "rules": [{"pattern": "bin/*", "mode": 0o755}],
+            },
+        )
+        dst = tmp_path / "dst"
+        expanded = {
+            path.relative_to(dst).as_posix(): (c.type_, c.mode, source)
+            for c, path, source in content.expand(dst, src)
+        }
+        assert expanded == {
+            "b": ("file", 0o600, src / "b"),
+            "bin": ("directory", 0o755, None),
+            "bin/a": ("file", 0o755, src / "bin/a"),
+            "link": ("link", 0o777, Path("b")),
+        }
+        content.create(src, "test", "1.0", dst, tmp_path, tmp_path)
+        assert (dst / "system/bin/a").stat().st_mode & 0o777 == content.rules[0].mode
+        assert (dst / "system/link").readlink() == Path("b")
+
+    def test_load_shared(self):
+        """Test Content.load function shares memory between contents."""
+        a = Content.load({"path": "{overlay}/a", "type": "file", "mode": 0o600})
+        b = Content.load({"path": "{overlay}/b", "type": "file", "mode": 0o600})
+        assert not hasattr(a, "__dict__")
+        assert a.xattr is b.xattr
+        assert a.mode_override is b.mode_override
+
     def test_remove(self, tmp_path: Path):
         """Test Content.remove function."""
         formatted_path = self._VALID_CONTENT_JSON["path"].format(
@@ -111,6 +197,7 @@ class TestContent:
         [
             _INVALID_CONTENT_JSON_MISSING_PATH,
             _INVALID_CONTENT_JSON_MISSING_TYPE,
+            _INVALID_CONTENT_JSON_COMPRESS_LEVEL,
             _INVALID_CONTENT_JSON_NONE,
         ],
     )
@@ -119,7 +206,13 @@ class TestContent:
         with pytest.raises(ValueError, match="Content.*"):
             _ = Content.load(data)
 
-    @pytest.mark.parametrize("data", [_INVALID_CONTENT_JSON_FILE_MISSING_CONTENT])
+    @pytest.mark.parametrize(
+        "data",
+        [
+            _INVALID_CONTENT_JSON_FILE_MISSING_CONTENT,
+            _INVALID_CONTENT_JSON_TREE_MISSING_SOURCE,
+        ],
+    )
     def test_load_invalid_no_raises(self, data: dict[str, Any]):
         """Test Content.load funciton with invalid inputs."""
         content = Content.load(data)
@@ -0,0 +1,164 @@
+"""Test src/waydroid_injector/extract.py."""
+
+import pytest
+from io import BytesIO
+from typing import Any
+from typing import ClassVar
+from pathlib import Path
+from pathlib import PurePosixPath
+from tarfile import SYMTYPE
+from tarfile import TarInfo
+from tarfile import open as tar_open
+from zipfile import ZipFile
+from zipfile import ZipInfo
+from waydroid_injector.extract import Extract
+
+
+@pytest.fixture
+def tree(tmp_path: Path) -> Path:
+    """Generate a directory to be archived."""
+    root = tmp_path / "tree"
+    (root / "top/keep/sub").mkdir(parents=True)
+    (root / "top/skip").mkdir(parents=True)
+    _ = (root / "top/keep/a").write_text("a")
+    _ = (root / "top/keep/sub/b").write_text("b")
+    _ = (root / "top/skip/c").write_text("c")
+    (root / "top/keep/a").chmod(0o755)
+    (root / "top/keep/link").symlink_to("a")
+    return root
+
+
+class TestExtract:
+    """Test Extract class."""
+
+    _VALID_EXTRACT_JSON: ClassVar[dict[str, Any]] = {
+        "strip-components": 1,
+        "include": ["keep"],
+    }
+
+    @pytest.mark.parametrize("mode", ["w", "w:gz", "w:bz2", "w:xz"])
+    def test_extract_tar(self, tmp_path: Path, tree: Path, mode: str):
+        """Test Extract.extract function with tar archives."""
+        archive = tmp_path / "archive"
+        with tar_open(archive, mode) as writer:  # pyright: ignore[reportCallIssue, reportArgumentType]
+            writer.add(tree / "top", "top")
+        srcdir = tmp_path / "src"
+        Extract.load(self._VALID_EXTRACT_JSON).extract(archive, srcdir)
+        self.__check(srcdir)
+
+    def test_extract_zip(self, tmp_path: Path, tree: Path):
+        """Test Extract.extract function with zip archives."""
+        archive = tmp_path / "archive"
+        with ZipFile(archive, "w") as writer:
+            for p in sorted((tree / "top").rglob("*")):
+                name = str(p.relative_to(tree))
+                if p.is_symlink():
+                    info = ZipInfo(name)
+                    info.external_attr = 0o120777 << 16
+                    writer.writestr(info, str(p.readlink()))
+                else:
+                    writer.write(p, name)
+        srcdir = tmp_path / "src"
+        Extract.load(self._VALID_EXTRACT_JSON).extract(archive, srcdir)
+        self.__check(srcdir)
+
+    @pytest.mark.filterwarnings("ignore:Duplicate name")
+    @pytest.mark.parametrize("kind", ["tar", "zip"])
+    @pytest.mark.parametrize(
+        ("links", "member"),
+        [
+            ({"link": "../outside"}, None),
+            ({"link": "/"}, None),
+            ({"link": "next/..", "next": "."}, None),
+            ({"link": "../outside"}, "link/file"),
+            ({"link": "../outside/file"}, "link"),
+            ({"link": "dir"}, "link/file"),
+        ],
+    )
+    def test_extract_symlink(
+        self,
+        tmp_path: Path,
+        kind: str,
+        links: dict[str, str],
+        member: str | None,
+    ):
+        """Test Extract.extract function keeps symlinks but not members under."""
+        archive = tmp_path / "archive"
+        outside = tmp_path / "outside"
+        outside.mkdir()
+        if kind == "zip":
+            with ZipFile(archive, "w") as writer:
+                for name, target in links.items():
+                    info = ZipInfo(name)
+                    info.external_attr = 0o120777 << 16
+                    writer.writestr(info, target)
+                if member is not None:
+                    writer.writestr(member, "test")
+        else:
+            with tar_open(archive, "w") as writer:
+                for name, target in links.items():
+                    info = TarInfo(name)
+                    info.type = SYMTYPE
+                    info.linkname = target
+                    writer.addfile(info)
+                if member is not None:
+                    info = TarInfo(member)
+                    info.size = len(b"test")
+                    writer.addfile(info, BytesIO(b"test"))
+        srcdir = tmp_path / "src"
+        srcdir.mkdir()
+        if member is None:
+            Extract().extract(archive, srcdir)
+            for name, target in links.items():
+                assert (srcdir / name).readlink() == Path(target)
+        else:
+            with pytest.raises(ValueError, match="under a symlink"):
+                Extract().extract(archive, srcdir)
+        assert list(outside.iterdir()) == []
+
+    def test_extract_invalid(self, tmp_path: Path):
+        """Test Extract.extract function with unsupported file."""
+        archive = tmp_path / "archive"
+        _ = archive.write_text("test")
+        with pytest.raises(ValueError, match="not a supported archive"):
+            Extract().extract(archive, tmp_path / "src")
+
+    @staticmethod
+    def __check(srcdir: Path):
+        assert (srcdir / "keep/a").read_text() == "a"
+        assert (srcdir / "keep/a").stat().st_mode & 0o777 == 0o755  # noqa: PLR2004
+        assert (srcdir / "keep/sub/b").read_text() == "b"
+        assert (srcdir / "keep/link").readlink() == Path("a")
+        assert not (srcdir / "skip").exists()
+        assert not (srcdir / "top").exists()
+
+    @pytest.mark.parametrize(
+        ("data", "valid"),
+        [
+            (_VALID_EXTRACT_JSON, True),
+            ({"strip-components": -1}, False),
+        ],
+    )
+    def test_valid(self, data: dict[str, Any], valid: bool):
+        """Test Extract.valid property."""
+        assert Extract.load(data).valid == valid
+
+    @pytest.mark.parametrize(
+        ("include", "path", "produced"),
+        [
+            ([], "a/b", True),
+            (["system/app/*"], "system/app/a/b", True),
+            (["system/app/*"], "system", True),
+            (["system/app/*"], "system/lib", False),
+            (["system/app/*"], "vendor", False),
+        ],
+    )
+    def test_produces(self, include: list[str], path: str, produced: bool):
+        """Test Extract.produces function."""
+        assert Extract(include=include).produces(PurePosixPath(path)) == produced
+
+    def test_load(self):
+        """Test Extract.load function."""
+        extract = Extract.load(self._VALID_EXTRACT_JSON)
+        assert extract.strip_components == self._VALID_EXTRACT_JSON["strip-components"]
+        assert extract.include == self._VALID_EXTRACT_JSON["include"]
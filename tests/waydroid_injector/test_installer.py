@@ -0,0 +1,139 @@
+"""Test src/waydroid_injector/installer.py."""
+
+import pytest
+from time import sleep
+from time import monotonic
+from typing import Any
+from typing import ClassVar
+from logging import DEBUG
+from pathlib import Path
+from collections.abc import Iterator
+from waydroid_injector.plan import PlannedContent
+from waydroid_injector.content import Content
+from waydroid_injector.installer import create_contents
+from waydroid_injector.installer import remove_empty_parents
+
+
+class TestCreateContents:
+    """Test create_contents function."""
+
+    _CONTENTS_JSON: ClassVar[list[dict[str, Any]]] = [
+        {"path": "{overlay}/system", "type": "directory", "mode": 0o700},
+        {"path": "{overlay}/system/a", "type": "file", "content": "a"},
+        {"path": "{overlay}/system/b", "type": "file", "content": "b"},
+        {"path": "{overlay}/system/c", "type": "link", "source": "a"},
+        {"path": "{overlay}/system/d", "type": "file", "source": "{overlay}/system/a"},
+        {"path": "{overlay}/system/a", "type": "file", "content": "overridden"},
+    ]
+
+    @staticmethod
+    def __plan(tmp_path: Path, contents: list[Content]) -> list[PlannedContent]:
+        args = (tmp_path / "overlay", tmp_path / "overlay_rw", tmp_path / "userdata")
+        return [
+            PlannedContent(
+                content,
+                content.get_path(*args),
+                content.get_source(tmp_path / "src", "test", "1.0", *args),
+            )
+            for content in contents
+        ]
+
+    @pytest.mark.parametrize("jobs", [1, 4])
+    def test_create_contents(
+        self,
+        tmp_path: Path,
+        caplog: pytest.LogCaptureFixture,
+        jobs: int,
+    ):
+        """Test create_contents function creates contents like in order."""
+        overlay = tmp_path / "overlay"
+        contents = [Content.load(i) for i in self._CONTENTS_JSON]
+        with caplog.at_level(DEBUG, "waydroid_injector.installer"):
+            create_contents(self.__plan(tmp_path, contents), jobs)
+        assert "make {} mkdir".format(len(contents)) in caplog.text
+        system = overlay / "system"
+        assert system.stat().st_mode & 0o777 == contents[0].mode
+        assert (system / "a").read_text() == "overridden"
+        assert (system / "b").read_text() == "b"
+        assert (system / "c").readlink() == Path("a")
+        assert (system / "d").read_text() == "a"
+
+    def test_create_contents_stream(self, tmp_path: Path):
+        """Test create_contents function creates contents before later ones come."""
+        overlay = tmp_path / "overlay"
+        contents = [
+            Content.load({"path": "{overlay}/" + name, "type": "file"})
+            for name in ["a", "b"]
+        ]
+        planned = self.__plan(tmp_path, contents)
+
+        def stream() -> Iterator[PlannedContent]:
+            yield planned[0]
+            deadline = monotonic() + 10
+            while not (overlay / "a").exists() and monotonic() < deadline:
+                sleep(0.01)
+            assert (overlay / "a").exists()
+            yield planned[1]
+
+        assert create_contents(stream(), 2) == planned
+        assert (overlay / "b").exists()
+
+    def test_create_contents_failed(self, tmp_path: Path):
+        """Test create_contents function raises the first error in order."""
+        overlay = tmp_path / "overlay"
+        contents = [
+            Content.load(i)
+            for i in [
+                {"path": "{overlay}/a", "type": "file", "source": "{srcdir}/a"},
+                {"path": "{overlay}/a/b", "type": "file", "content": "b"},
+                {"path": "{overlay}/c", "type": "file", "source": "{srcdir}/c"},
+                {"path": "{overlay}/d", "type": "file", "content": "d"},
+            ]
+        ]
+        with pytest.raises(FileNotFoundError, match="src/a"):
+            create_contents(self.__plan(tmp_path, contents), 4)
+        assert not (overlay / "a").exists()
+        assert (overlay / "d").read_text() == "d"
+
+    def test_create_contents_under_link(self, tmp_path: Path):
+        """Test create_contents function does not create parents under links."""
+        overlay = tmp_path / "overlay"
+        (overlay / "real").mkdir(parents=True)
+        contents = [
+            Content.load(i)
+            for i in [
+                {"path": "{overlay}/link", "type": "link", "source": "real"},
+                {"path": "{overlay}/link/a/b", "type": "file", "content": "b"},
+                {"path": "{overlay}/new/a/b", "type": "file", "content": "b"},
+            ]
+        ]
+        create_contents(self.__plan(tmp_path, contents), 4)
+        assert (overlay / "real/a/b").read_text() == "b"
+        assert (overlay / "new/a/b").read_text() == "b"
+
+
+class TestRemoveEmptyParents:
+    """Test remove_empty_parents function."""
+
+    def test_remove_empty_parents(self, tmp_path: Path):
+        """Test remove_empty_parents function removes empty parents only."""
+        overlay = tmp_path / "overlay"
+        for directory in ["system/a/b", "system/c", "vendor/d"]:
+            (overlay / directory).mkdir(parents=True)
+        _ = (overlay / "system/c/kept").write_text("kept")
+        removed = [overlay / "system/a/b/file", overlay / "system/c/file"]
+        cleaned = remove_empty_parents(removed, [overlay], [overlay / "system"])
+        assert cleaned == [overlay / "system/a/b", overlay / "system/a"]
+        assert (overlay / "system/c").is_dir()
+        assert (overlay / "vendor/d").is_dir()
+
+    def test_remove_empty_parents_outside(self, tmp_path: Path):
+        """Test remove_empty_parents function skips paths outside roots."""
+        (tmp_path / "outside/a").mkdir(parents=True)
+        cleaned = remove_empty_parents(
+            [tmp_path / "outside/a/file"],
+            [tmp_path / "overlay"],
+            [],
+        )
+        assert cleaned == []
+        assert (tmp_path / "outside/a").is_dir()
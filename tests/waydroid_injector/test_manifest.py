@@ -4,8 +4,12 @@ import pytest
 from typing import Any
 from typing import ClassVar
 from pathlib import Path
+from tarfile import open as tar_open
 from configparser import ConfigParser
+from waydroid_injector.content import Content
 from waydroid_injector.manifest import Manifest
+from waydroid_injector.transaction import Transaction
+from waydroid_injector.type_defines import SkipMode
 
 
 @pytest.fixture
@@ -86,6 +90,261 @@ class TestManifest:
         target = p / "test"
         assert target.is_file()
 
+    def test_install_fresh(self, destdir: Path):
+        """Test Manifest.install function creates roots missing."""
+        waydroid = destdir / "var/lib/waydroid"
+        (waydroid / "overlay").rmdir()
+        (waydroid / "overlay_rw").rmdir()
+        data = {
+            **self._VALID_MANIFEST,
+            "contents": [
+                {"path": "{overlay}/system/a", "type": "file", "content": "a"},
+                {"path": "{overlay_rw}/b", "type": "file", "content": "b"},
+            ],
+        }
+        Manifest.load(data).install(True, destdir)
+        assert (waydroid / "overlay/system/a").read_text() == "a"
+        assert (waydroid / "overlay_rw/b").read_text() == "b"
+        assert not (waydroid / "injector/journal.json").exists()
+
+    def test_install_sources(self, destdir: Path):
+        """Test Manifest.install function with sources prepared in parallel."""
+        sources = [destdir / "a", destdir / "b"]
+        for source in sources:
+            _ = source.write_text(source.name)
+        data = {
+            **self._VALID_MANIFEST,
+            "sources": [
+                {
+                    "path": str(source),
+                    "build": {"cmd": ["cp", source.name, "built-" + source.name]},
+                }
+                for source in sources
+            ],
+            "contents": [
+                {
+                    "path": "{overlay}/" + source.name,
+                    "type": "file",
+                    "source": "{srcdir}/built-" + source.name,
+                }
+                for source in sources
+            ],
+        }
+        manifest = Manifest.load(data)
+        manifest.install(True, destdir, jobs=2)
+        overlay = destdir / "var/lib/waydroid/overlay"
+        for source in sources:
+            assert (overlay / source.name).read_text() == source.name
+
+    def test_install_sources_failed(self, destdir: Path):
+        """Test Manifest.install function aborts when a source fails."""
+        source = destdir / "a"
+        _ = source.write_text(source.name)
+        data = {
+            **self._VALID_MANIFEST,
+            "sources": [
+                {"path": str(source)},
+                {"path": str(source), "file-name": "b", "checksum": {"sha256": "0"}},
+            ],
+        }
+        manifest = Manifest.load(data)
+        with pytest.raises(RuntimeError, match="Checksum mismatch."):
+            manifest.install(True, destdir, jobs=2)
+        assert not (destdir / "var/lib/waydroid/overlay/test").exists()
+
+    def test_compile(self, tmp_path: Path):
+        """Test Manifest.compile function."""
+        manifest = Manifest.load(self._VALID_MANIFEST)
+        waydroid = tmp_path / "var/lib/waydroid"
+        plan = manifest.compile(
+            waydroid,
+            waydroid / "overlay",
+            waydroid / "overlay_rw",
+            tmp_path / "userdata",
+        )
+        assert plan.srcdir == waydroid / "injector/test-1.0"
+        assert [planned.path for planned in plan.contents] == [
+            waydroid / "overlay/test",
+        ]
+        assert plan.contents[0].source is None
+
+    def test_reinstall(self, destdir: Path):
+        """Test Manifest.install function skips unchanged contents."""
+        data = {
+            **self._VALID_MANIFEST,
+            "contents": [
+                {"path": "{overlay}/a", "type": "file", "content": "a"},
+                {"path": "{overlay}/b", "type": "file", "content": "b"},
+            ],
+        }
+        Manifest.load(data).install(True, destdir)
+        overlay = destdir / "var/lib/waydroid/overlay"
+        a_mtime_ns = (overlay / "a").stat().st_mtime_ns
+
+        data["contents"] = [{"path": "{overlay}/a", "type": "file", "content": "a"}]
+        Manifest.load(data).install(True, destdir)
+        assert (overlay / "a").stat().st_mtime_ns == a_mtime_ns
+        assert not (overlay / "b").exists()
+
+        _ = (overlay / "a").write_text("changed")
+        Manifest.load(data).install(True, destdir)
+        assert (overlay / "a").read_text() == "a"
+
+    @pytest.mark.parametrize("skip_unchanged", ["stat", "digest"])
+    def test_reinstall_skip_unchanged(self, destdir: Path, skip_unchanged: SkipMode):
+        """Test Manifest.install function only repairs mode of unchanged files."""
+        mode = 0o644
+        data = {
+            **self._VALID_MANIFEST,
+            "contents": [
+                {"path": "{overlay}/a", "type": "file", "mode": mode, "content": "a"},
+            ],
+        }
+        Manifest.load(data).install(True, destdir)
+        p = destdir / "var/lib/waydroid/overlay/a"
+        inode = p.stat().st_ino
+        p.chmod(0o600)
+        Manifest.load(data).install(True, destdir, skip_unchanged=skip_unchanged)
+        assert p.stat().st_ino == inode
+        assert p.stat().st_mode & 0o777 == mode
+
+    def test_install_tree(self, destdir: Path):
+        """Test Manifest.install function mirrors trees and removes them."""
+        mode = 0o600
+        tree = destdir / "tree"
+        (tree / "lib").mkdir(parents=True)
+        _ = (tree / "lib/a.so").write_text("a")
+        archive = destdir / "tree.tar"
+        with tar_open(archive, "w") as writer:
+            writer.add(tree / "lib", "tree/lib")
+        data = {
+            **self._VALID_MANIFEST,
+            "sources": [{"path": str(archive), "build": {"extract": True}}],
+            "contents": [
+                {
+                    "path": "{overlay}/system",
+                    "type": "tree",
+                    "source": "{srcdir}/tree",
+                    "rules": [{"pattern": "*.so", "mode": mode}],
+                },
+            ],
+        }
+        Manifest.load(data).install(True, destdir)
+        p = destdir / "var/lib/waydroid/overlay/system/lib/a.so"
+        assert p.read_text() == "a"
+        assert p.stat().st_mode & 0o777 == mode
+        Manifest.load(data).uninstall(True, destdir)
+        assert not p.exists()
+        assert not p.parent.exists()
+
+    def test_install_stream(self, destdir: Path):
+        """Test Manifest.install function with contents loaded one at a time."""
+        data = {
+            **self._VALID_MANIFEST,
+            "contents": [
+                {"path": "{overlay}/a", "type": "file", "content": "a"},
+                {"path": "{overlay}/b", "type": "file"},
+                {"path": "{overlay}/c", "type": "file", "content": "c"},
+            ],
+        }
+        manifest = Manifest.stream(data)
+        assert len(manifest.contents) == len(data["contents"])
+        manifest.install(True, destdir)
+        overlay = destdir / "var/lib/waydroid/overlay"
+        assert (overlay / "c").read_text() == "c"
+
+        assert (overlay / "a").read_text() == "a"
+
+    @pytest.mark.parametrize(
+        ("content", "match"),
+        [
+            ({"path": "{overlay}/a/c", "type": "file"}, "under file"),
+            ({"path": "{overlay}/c"}, "Content.type"),
+        ],
+    )
+    def test_install_stream_rollback(
+        self,
+        destdir: Path,
+        monkeypatch: pytest.MonkeyPatch,
+        content: dict[str, Any],
+        match: str,
+    ):
+        """Test Manifest.install function rolls back problems found in stream."""
+        data = {
+            **self._VALID_MANIFEST,
+            "contents": [{"path": "{overlay}/a", "type": "file", "content": "a"}],
+        }
+        Manifest.stream(data).install(True, destdir)
+        data["contents"] = [
+            {"path": "{overlay}/a", "type": "file", "content": "changed"},
+            {"path": "{overlay}/b", "type": "file", "content": "b"},
+            content,
+        ]
+        loaded: list[dict[str, Any]] = []
+        load = Content.load
+        staging = Transaction.staging_of(destdir / "var/lib/waydroid/overlay")
+        rolled_back: list[bool] = []
+        rollback = Transaction.rollback
+
+        def load_once(data: dict[str, Any]) -> Content:
+            loaded.append(data)
+            return load(data)
+
+        def record_rollback(self: Transaction):
+            rolled_back.append(staging.exists())
+            rollback(self)
+
+        monkeypatch.setattr(Content, "load", load_once)
+        monkeypatch.setattr(Transaction, "rollback", record_rollback)
+        with pytest.raises(ValueError, match=match):
+            Manifest.stream(data).install(True, destdir)
+        assert loaded == data["contents"]
+        # The first one is recovering, the last one discards contents staged.
+        assert rolled_back == [False, True]
+        assert not staging.exists()
+        waydroid = destdir / "var/lib/waydroid"
+        assert (waydroid / "overlay/a").read_text() == "a"
+        assert not (waydroid / "overlay/b").exists()
+
+    def test_install_check(self, destdir: Path):
+        """Test Manifest.install function refuses manifests with problems."""
+        data = {
+            **self._VALID_MANIFEST,
+            "contents": [
+                {"path": "{overlay}/a", "type": "file", "content": "a"},
+                {"path": "{overlay}/b", "type": "file", "source": "{srcdir}/b"},
+            ],
+        }
+        with pytest.raises(ValueError, match="no source produces"):
+            Manifest.load(data).install(True, destdir)
+        assert not (destdir / "var/lib/waydroid/injector").exists()
+
+    def test_uninstall_owned(self, destdir: Path):
+        """Test Manifest.uninstall function keeps paths owned by others."""
+        other = {**self._VALID_MANIFEST, "name": "other"}
+        Manifest.load(self._VALID_MANIFEST).install(True, destdir)
+        Manifest.load(other).install(True, destdir)
+        p = destdir / "var/lib/waydroid/overlay/test"
+        Manifest.load(self._VALID_MANIFEST).uninstall(True, destdir)
+        assert p.exists()
+        Manifest.load(other).uninstall(True, destdir)
+        assert not p.exists()
+
+    def test_install_rollback(self, destdir: Path):
+        """Test Manifest.install function leaves overlay as is when failed."""
+        data = {
+            **self._VALID_MANIFEST,
+            "contents": [
+                {"path": "{overlay}/a", "type": "file", "content": "a"},
+                {"path": "{overlay}/b", "type": "file", "source": "{overlay_rw}/b"},
+            ],
+        }
+        with pytest.raises(FileNotFoundError):
+            Manifest.load(data).install(True, destdir)
+        waydroid = destdir / "var/lib/waydroid"
+        assert not (waydroid / "overlay/a").exists()
+        assert not (waydroid / ".overlay.staging").exists()
+
     def test_uninstall(self, destdir: Path):
         """Test Manifest.uninstall function."""
         p = destdir / "var/lib/waydroid/overlay/test"
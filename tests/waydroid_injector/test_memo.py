@@ -0,0 +1,42 @@
+"""Test src/waydroid_injector/memo.py."""
+
+from pathlib import Path
+from waydroid_injector.memo import DigestMemo
+
+
+class TestDigestMemo:
+    """Test DigestMemo class."""
+
+    def test_lookup(self, tmp_path: Path):
+        """Test DigestMemo.lookup function."""
+        p = tmp_path / "test"
+        _ = p.write_text("test")
+        memo = DigestMemo(tmp_path / "memo.json")
+        assert memo.lookup(p.stat()) is None
+        memo.store(p.stat(), {"sha256": "test"})
+        assert memo.lookup(p.stat()) == {"sha256": "test"}
+        _ = p.write_text("changed")
+        assert memo.lookup(p.stat()) is None
+
+    def test_save(self, tmp_path: Path):
+        """Test DigestMemo.save function only keeps entries used."""
+        used = tmp_path / "used"
+        unused = tmp_path / "unused"
+        _ = used.write_text("used")
+        _ = unused.write_text("unused")
+        memo = DigestMemo(tmp_path / "memo.json")
+        memo.store(used.stat(), {"sha256": "used"})
+        memo.store(unused.stat(), {"sha256": "unused"})
+        memo.save()
+        memo = DigestMemo.load(memo.path)
+        assert memo.lookup(used.stat()) == {"sha256": "used"}
+        memo.save()
+        memo = DigestMemo.load(memo.path)
+        assert memo.lookup(used.stat()) == {"sha256": "used"}
+        assert memo.lookup(unused.stat()) is None
+
+    def test_load_invalid(self, tmp_path: Path):
+        """Test DigestMemo.load function with invalid file."""
+        p = tmp_path / "memo.json"
+        _ = p.write_text("[")
+        assert DigestMemo.load(p).entries == {}
@@ -3,10 +3,128 @@
 # pyright: reportAny=false
 
 import pytest
+from os import urandom
+from http import HTTPStatus
+from time import sleep
 from typing import Any
 from typing import ClassVar
+from typing import override
+from hashlib import sha256
 from pathlib import Path
+from threading import Thread
+from http.client import IncompleteRead
+from http.server import ThreadingHTTPServer
+from http.server import BaseHTTPRequestHandler
+from collections.abc import Callable
+from collections.abc import Iterator
+from waydroid_injector.cache import Cache
 from waydroid_injector.source import Source
+from waydroid_injector.checksum import Hasher
+
+
+class _Server(ThreadingHTTPServer):
+    payload: bytes = b""
+    accept_ranges: bool = True
+    range_shift: int = 0
+    redirect: str | None = None
+    interrupt_at: int | None = None
+    delay: float = 0
+    status: HTTPStatus = HTTPStatus.OK
+    ranges: list[str]
+    paths: list[str]
+
+    @override
+    def server_activate(self):
+        self.ranges = []
+        self.paths = []
+        super().server_activate()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: _Server  # pyright: ignore[reportIncompatibleVariableOverride]
+
+    def do_HEAD(self):  # noqa: N802
+        sleep(self.server.delay)
+        if self.__redirect():
+            return
+        if self.server.status != HTTPStatus.OK:
+            self.send_error(self.server.status)
+            return
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Length", str(len(self.server.payload)))
+        self.end_headers()
+
+    def do_GET(self):  # noqa: N802
+        self.server.paths.append(self.path)
+        sleep(self.server.delay)
+        if self.__redirect():
+            return
+        if self.server.status != HTTPStatus.OK:
+            self.send_error(self.server.status)
+            return
+        payload = self.server.payload
+        range_ = self.headers.get("Range")
+        if range_ is not None:
+            self.server.ranges.append(range_)
+        if range_ is not None and self.server.accept_ranges:
+            start = int(range_.removeprefix("bytes=").removesuffix("-"))
+            start -= self.server.range_shift
+            if start >= len(payload):
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.end_headers()
+                return
+            self.send_response(HTTPStatus.PARTIAL_CONTENT)
+            self.send_header(
+                "Content-Range",
+                "bytes {}-{}/{}".format(start, len(payload) - 1, len(payload)),
+            )
+            payload = payload[start:]
+        else:
+            self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if self.server.interrupt_at is not None:
+            payload = payload[: self.server.interrupt_at]
+            self.close_connection = True
+        _ = self.wfile.write(payload)
+
+    def __redirect(self) -> bool:
+        if self.server.redirect is None:
+            return False
+        self.send_response(HTTPStatus.FOUND)
+        self.send_header("Location", self.server.redirect + self.path)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+        return True
+
+    @override
+    def log_message(self, format: str, *args: Any):
+        return
+
+
+@pytest.fixture
+def servers() -> Iterator[Callable[[], _Server]]:
+    """Get a function to run local http servers serving _Server.payload."""
+    running: list[tuple[_Server, Thread]] = []
+
+    def run() -> _Server:
+        s = _Server(("127.0.0.1", 0), _Handler)
+        thread = Thread(target=s.serve_forever, args=(0.01,), daemon=True)
+        thread.start()
+        running.append((s, thread))
+        return s
+
+    yield run
+    for s, thread in running:
+        s.shutdown()
+        s.server_close()
+        thread.join()
+
+
+@pytest.fixture
+def server(servers: Callable[[], _Server]) -> _Server:
+    """Run a local http server serving _Server.payload."""
+    return servers()
 
 
 class TestSource:
@@ -16,6 +134,10 @@ class TestSource:
     _VALID_SOURCE_JSON_URL: ClassVar[dict[str, Any]] = {
         "url": "https://example.com/file.bin",
     }
+    _VALID_SOURCE_JSON_MIRRORS: ClassVar[dict[str, Any]] = {
+        "url": ["https://example.com/file.bin", "https://example.org/file.bin"],
+    }
+    _INVALID_SOURCE_JSON_NO_MIRROR: ClassVar[dict[str, Any]] = {"url": []}
     _INVALID_SOURCE_JSON_PATH: ClassVar[dict[str, Any]] = {"path": "/path/to/test"}
     _VALID_SOURCE_JSON_PATH: ClassVar[dict[str, Any]] = {"path": "/usr/bin"}
     _VALID_SOURCE_JSON_FILE_NAME: ClassVar[dict[str, Any]] = {
@@ -42,6 +164,200 @@ class TestSource:
         f = srcdir / "test"
         assert f.exists()
 
+    def test_get_url(self, srcdir: Path, server: _Server):
+        """Test Source.get function with url."""
+        server.payload = urandom(Hasher.CHUNK_SIZE * 2 + 42)
+        source = Source.load(
+            {
+                "url": "http://127.0.0.1:{}/file.bin".format(server.server_port),
+                "checksum": {"sha256": sha256(server.payload).hexdigest()},
+            },
+        )
+        source.get(srcdir, "test", "1.0")
+        assert (srcdir / "file.bin").read_bytes() == server.payload
+        assert not (srcdir / "file.bin.part").exists()
+
+    def test_get_url_checksum_mismatch(self, srcdir: Path, server: _Server):
+        """Test Source.get function with url serving unexpected content."""
+        server.payload = urandom(42)
+        source = Source.load(
+            {
+                "url": "http://127.0.0.1:{}/file.bin".format(server.server_port),
+                "checksum": {"sha256": sha256(b"").hexdigest()},
+            },
+        )
+        with pytest.raises(RuntimeError, match="Checksum mismatch."):
+            source.get(srcdir, "test", "1.0")
+        assert not (srcdir / "file.bin").exists()
+        assert not (srcdir / "file.bin.part").exists()
+
+    def test_get_url_cache(self, tmp_path: Path, server: _Server):
+        """Test Source.get function with cache."""
+        server.payload = urandom(42)
+        source = Source.load(
+            {
+                "url": "http://127.0.0.1:{}/file.bin".format(server.server_port),
+                "checksum": {"sha256": sha256(server.payload).hexdigest()},
+            },
+        )
+        cache = Cache(tmp_path / "cache")
+        for srcdir in [tmp_path / "a", tmp_path / "b"]:
+            srcdir.mkdir()
+            source.get(srcdir, "test", "1.0", cache)
+            assert (srcdir / "file.bin").read_bytes() == server.payload
+        assert server.paths == ["/file.bin"]
+
+    def test_get_url_cache_corrupted(self, tmp_path: Path, server: _Server):
+        """Test Source.get function with corrupted cache."""
+        server.payload = urandom(42)
+        sha256_ = sha256(server.payload).hexdigest()
+        source = Source.load(
+            {
+                "url": "http://127.0.0.1:{}/file.bin".format(server.server_port),
+                "checksum": {"sha256": sha256_},
+            },
+        )
+        cache = Cache(tmp_path / "cache")
+        cache.root.mkdir()
+        _ = (cache.root / sha256_).write_bytes(urandom(42))
+        srcdir = tmp_path / "src"
+        srcdir.mkdir()
+        source.get(srcdir, "test", "1.0", cache)
+        assert (srcdir / "file.bin").read_bytes() == server.payload
+        assert (cache.root / sha256_).read_bytes() == server.payload
+
+    def test_get_url_mirrors(self, srcdir: Path, servers: Callable[[], _Server]):
+        """Test Source.get function with the fastest mirror."""
+        slow, fast = servers(), servers()
+        slow.delay = 0.5
+        for s in [slow, fast]:
+            s.payload = urandom(42)
+        source = Source.load(
+            {
+                "url": [
+                    "http://127.0.0.1:{}/file.bin".format(s.server_port)
+                    for s in [slow, fast]
+                ],
+                "checksum": {"sha256": sha256(fast.payload).hexdigest()},
+            },
+        )
+        source.get(srcdir, "test", "1.0")
+        assert (srcdir / "file.bin").read_bytes() == fast.payload
+        assert fast.paths == ["/file.bin"]
+        assert slow.paths == []
+
+    def test_get_url_mirrors_redirect(
+        self,
+        srcdir: Path,
+        servers: Callable[[], _Server],
+    ):
+        """Test Source.get function probes redirected mirrors without GET."""
+        redirect, slow, target = servers(), servers(), servers()
+        redirect.redirect = "http://127.0.0.1:{}".format(target.server_port)
+        slow.delay = 0.5
+        for s in [slow, target]:
+            s.payload = urandom(42)
+        source = Source.load(
+            {
+                "url": [
+                    "http://127.0.0.1:{}/file.bin".format(s.server_port)
+                    for s in [slow, redirect]
+                ],
+                "checksum": {"sha256": sha256(target.payload).hexdigest()},
+            },
+        )
+        source.get(srcdir, "test", "1.0")
+        assert (srcdir / "file.bin").read_bytes() == target.payload
+        assert target.paths == ["/file.bin"]
+        assert slow.paths == []
+
+    @pytest.mark.parametrize(
+        "status",
+        [HTTPStatus.OK, HTTPStatus.NOT_FOUND],
+    )
+    def test_get_url_mirrors_fallback(
+        self,
+        srcdir: Path,
+        servers: Callable[[], _Server],
+        status: HTTPStatus,
+    ):
+        """Test Source.get function falls back to the next mirror."""
+        broken, slow = servers(), servers()
+        broken.status = status
+        slow.delay = 0.2
+        broken.payload = urandom(42)
+        slow.payload = urandom(42)
+        source = Source.load(
+            {
+                "url": [
+                    "http://127.0.0.1:{}/file.bin".format(s.server_port)
+                    for s in [broken, slow]
+                ],
+                "checksum": {"sha256": sha256(slow.payload).hexdigest()},
+            },
+        )
+        source.get(srcdir, "test", "1.0")
+        assert (srcdir / "file.bin").read_bytes() == slow.payload
+        assert slow.paths == ["/file.bin"]
+
+    @pytest.mark.parametrize("accept_ranges", [True, False])
+    def test_get_url_resume(
+        self,
+        srcdir: Path,
+        server: _Server,
+        accept_ranges: bool,
+    ):
+        """Test Source.get function resumes interrupted download."""
+        server.payload = urandom(Hasher.CHUNK_SIZE + 42)
+        server.accept_ranges = accept_ranges
+        server.interrupt_at = Hasher.CHUNK_SIZE
+        source = Source.load(
+            {
+                "url": "http://127.0.0.1:{}/file.bin".format(server.server_port),
+                "checksum": {"sha256": sha256(server.payload).hexdigest()},
+            },
+        )
+        with pytest.raises(IncompleteRead):
+            source.get(srcdir, "test", "1.0")
+        part = srcdir / "file.bin.part"
+        assert part.stat().st_size == Hasher.CHUNK_SIZE
+        server.interrupt_at = None
+        source.get(srcdir, "test", "1.0")
+        assert server.ranges == ["bytes={}-".format(Hasher.CHUNK_SIZE)]
+        assert (srcdir / "file.bin").read_bytes() == server.payload
+        assert not part.exists()
+
+    def test_get_url_resume_misaligned(self, srcdir: Path, server: _Server):
+        """Test Source.get function restarts when partial content is misaligned."""
+        server.payload = urandom(Hasher.CHUNK_SIZE + 42)
+        server.range_shift = 1
+        part = srcdir / "file.bin.part"
+        _ = part.write_bytes(server.payload[:42])
+        source = Source.load(
+            {
+                "url": "http://127.0.0.1:{}/file.bin".format(server.server_port),
+                "checksum": {"sha256": sha256(server.payload).hexdigest()},
+            },
+        )
+        source.get(srcdir, "test", "1.0")
+        assert server.ranges == ["bytes=42-"]
+        assert server.paths == ["/file.bin", "/file.bin"]
+        assert (srcdir / "file.bin").read_bytes() == server.payload
+        assert not part.exists()
+
+    def test_get_url_resume_complete(self, srcdir: Path, server: _Server):
+        """Test Source.get function restarts when range is not satisfiable."""
+        server.payload = urandom(42)
+        _ = (srcdir / "file.bin.part").write_bytes(urandom(42))
+        source = Source.load(
+            {
+                "url": "http://127.0.0.1:{}/file.bin".format(server.server_port),
+                "checksum": {"sha256": sha256(server.payload).hexdigest()},
+            },
+        )
+        source.get(srcdir, "test", "1.0")
+        assert (srcdir / "file.bin").read_bytes() == server.payload
+
     def test_do_build(self, tmp_path: Path, srcdir: Path):
         """Test Source.do_build function."""
         source_json = {
@@ -52,6 +368,62 @@ class TestSource:
         source.do_build(srcdir, "test", "1.0")
         assert (srcdir / "build").is_file()
 
+    def test_do_build_stamp(self, tmp_path: Path, srcdir: Path):
+        """Test Source.do_build function skips building with stamp matched."""
+        p = tmp_path / "test"
+        _ = p.write_text("test")
+        source_json: dict[str, Any] = {
+            "path": str(p),
+            "build": {"cmd": ["sh", "-c", "echo built >> log"]},
+        }
+        source = Source.load(source_json)
+        source.get(srcdir, "test", "1.0")
+        for _ in range(2):
+            source.do_build(srcdir, "test", "1.0")
+            source.cleanup(srcdir, "test", "1.0")
+            assert (srcdir / "log").read_text() == "built\n"
+
+        source_json["build"] = {"cmd": ["touch", "rebuilt"]}
+        source = Source.load(source_json)
+        source.do_build(srcdir, "test", "1.0")
+        assert not (srcdir / "log").exists()
+        assert (srcdir / "rebuilt").exists()
+
+        (srcdir / "rebuilt").unlink()
+        source.do_build(srcdir, "test", "1.0")
+        assert (srcdir / "rebuilt").exists()
+
+    def test_do_build_concurrent(self, tmp_path: Path, srcdir: Path):
+        """Test Source.do_build function records outputs of concurrent builds."""
+        sources: list[Source] = []
+        for name in ["a", "b"]:
+            p = tmp_path / name
+            _ = p.write_text(name)
+            source = Source.load(
+                {
+                    "path": str(p),
+                    "build": {
+                        "cmd": ["sh", "-c", "sleep 0.2; touch out_{}".format(name)],
+                    },
+                },
+            )
+            source.get(srcdir, "test", "1.0")
+            sources.append(source)
+        threads = [
+            Thread(target=source.do_build, args=(srcdir, "test", "1.0", [other]))
+            for source, other in zip(sources, ["b", "a"], strict=True)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for source, name in zip(sources, ["a", "b"], strict=True):
+            assert source.outputs(srcdir, "test", "1.0") == {
+                name,
+                ".{}.stamp".format(name),
+                "out_{}".format(name),
+            }
+
     def test_cleanup(self, srcdir: Path):
         """Test Source.cleanup function."""
         remove = srcdir / "remove"
@@ -72,6 +444,8 @@ class TestSource:
             (_INVALID_SOURCE_JSON_PATH, False),
             (_VALID_SOURCE_JSON_PATH, True),
             (_VALID_SOURCE_JSON_URL, True),
+            (_VALID_SOURCE_JSON_MIRRORS, True),
+            (_INVALID_SOURCE_JSON_NO_MIRROR, False),
         ],
     )
     def test_valid(self, data: dict[str, Any], valid: bool):
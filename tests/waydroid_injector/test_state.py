@@ -0,0 +1,44 @@
+"""Test src/waydroid_injector/state.py."""
+
+from pathlib import Path
+from waydroid_injector.state import StateEntry
+from waydroid_injector.state import InstallState
+
+
+class TestStateEntry:
+    """Test StateEntry class."""
+
+    def test_matches(self, tmp_path: Path):
+        """Test StateEntry.matches function."""
+        p = tmp_path / "test"
+        _ = p.write_text("test")
+        entry = StateEntry.capture(p, "test", "1.0", "file", {}, "0")
+        assert entry.digest is not None
+        assert entry.matches(p.lstat())
+        _ = p.write_text("changed")
+        assert not entry.matches(p.lstat())
+        directory = StateEntry.capture(tmp_path, "test", "1.0", "directory", {}, "0")
+        assert directory.digest is None
+        assert directory.matches(tmp_path.lstat())
+
+
+class TestInstallState:
+    """Test InstallState class."""
+
+    def test_record(self, tmp_path: Path):
+        """Test InstallState.record function."""
+        p = tmp_path / "test"
+        _ = p.write_text("test")
+        entry = StateEntry.capture(p, "a", "1.0", "file", {"user.a": "a"}, "0")
+        db = tmp_path / "injector/state.db"
+        with InstallState(db) as state:
+            state.record([entry])
+        with InstallState(db) as state:
+            assert state.entries("a") == {p: entry}
+            assert state.owner(p) == "a"
+            entry.manifest = "b"
+            state.record([entry])
+            assert state.entries("a") == {}
+            assert state.entries("b") == {p: entry}
+            state.forget([p])
+            assert state.entries("b") == {}
@@ -0,0 +1,82 @@
+"""Test src/waydroid_injector/transaction.py."""
+
+import pytest
+from json import dumps
+from pathlib import Path
+from waydroid_injector.plan import PlannedContent
+from waydroid_injector.content import Content
+from waydroid_injector.installer import create_contents
+from waydroid_injector.transaction import Transaction
+
+
+class TestTransaction:
+    """Test Transaction class."""
+
+    def test_commit(self, tmp_path: Path):
+        """Test Transaction.commit function."""
+        overlay = tmp_path / "overlay"
+        (overlay / "system").mkdir(parents=True)
+        _ = (overlay / "system/a").write_text("old")
+        contents = [
+            Content("{overlay}/system", "directory", 0o700),
+            Content("{overlay}/system/a", "file", content="new"),
+            Content("{overlay}/vendor/b/c", "file", content="c"),
+        ]
+        roots = (overlay, tmp_path / "overlay_rw", tmp_path / "userdata")
+        transaction = Transaction(tmp_path / "journal.json", list(roots))
+        planned = (
+            PlannedContent(content, content.get_path(overlay, overlay, overlay), None)
+            for content in contents
+        )
+        staged = list(transaction.stage(planned))
+        assert staged[0].path == Transaction.staging_of(overlay) / "system"
+        create_contents(staged)
+        assert (overlay / "system/a").read_text() == "old"
+        transaction.commit(staged)
+        assert (overlay / "system").stat().st_mode & 0o777 == contents[0].mode
+        assert (overlay / "system/a").read_text() == "new"
+        assert (overlay / "vendor/b/c").read_text() == "c"
+        assert not Transaction.staging_of(overlay).exists()
+        assert not transaction.journal.exists()
+
+    def test_recover(self, tmp_path: Path):
+        """Test Transaction.recover function."""
+        overlay = tmp_path / "overlay"
+        overlay.mkdir()
+        staging = Transaction.staging_of(overlay)
+        staging.mkdir()
+        _ = (staging / "a").write_text("a")
+        transaction = Transaction(tmp_path / "journal.json", [overlay])
+        transaction.recover()
+        assert not staging.exists()
+        assert not (overlay / "a").exists()
+
+        staging.mkdir()
+        _ = (staging / "a").write_text("a")
+        operations = [["file", str(staging / "a"), str(overlay / "a")]]
+        _ = transaction.journal.write_text(dumps({"operations": operations}))
+        transaction.recover()
+        assert not staging.exists()
+        assert not transaction.journal.exists()
+        assert (overlay / "a").read_text() == "a"
+
+    def test_recover_failed(self, tmp_path: Path):
+        """Test Transaction.recover function keeps the journal when failed."""
+        overlay = tmp_path / "overlay"
+        staging = Transaction.staging_of(overlay)
+        staging.mkdir()
+        _ = (staging / "a").write_text("a")
+        transaction = Transaction(tmp_path / "journal.json", [overlay])
+        operations = [["file", str(staging / "a"), str(overlay / "b/a")]]
+        _ = transaction.journal.write_text(dumps({"operations": operations}))
+        with pytest.raises(FileNotFoundError):
+            transaction.recover()
+        assert overlay.is_dir()
+        assert (staging / "a").exists()
+        assert transaction.journal.exists()
+
+        (overlay / "b").mkdir()
+        transaction.recover()
+        assert (overlay / "b/a").read_text() == "a"
+        assert not staging.exists()
+        assert not transaction.journal.exists()
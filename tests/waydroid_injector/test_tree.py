@@ -0,0 +1,38 @@
+"""Test src/waydroid_injector/tree.py."""
+
+import pytest
+from typing import Any
+from typing import ClassVar
+from waydroid_injector.tree import TreeRule
+
+
+class TestTreeRule:
+    """Test TreeRule class."""
+
+    _VALID_TREE_RULE_JSON: ClassVar[dict[str, Any]] = {
+        "pattern": "bin/*",
+        "mode": 0o755,
+        "xattr": {"user.test": "test"},
+    }
+    _INVALID_TREE_RULE_JSON_NO_PATTERN: ClassVar[dict[str, Any]] = {"mode": 0o755}
+
+    @pytest.mark.parametrize(
+        ("relative", "matches"),
+        [("bin/a", True), ("bin/sub/a", True), ("lib/bin/a", False), ("bin", False)],
+    )
+    def test_matches(self, relative: str, matches: bool):
+        """Test TreeRule.matches function."""
+        rule = TreeRule.load(self._VALID_TREE_RULE_JSON)
+        assert rule.matches(relative) == matches
+
+    def test_load_valid(self):
+        """Test TreeRule.load function with valid inputs."""
+        rule = TreeRule.load(self._VALID_TREE_RULE_JSON)
+        assert rule.valid
+        assert rule.mode == self._VALID_TREE_RULE_JSON["mode"]
+        assert rule.xattr == {"user.test": "test"}
+
+    def test_load_invalid(self):
+        """Test TreeRule.load function with invalid inputs."""
+        with pytest.raises(ValueError, match="TreeRule.*"):
+            _ = TreeRule.load(self._INVALID_TREE_RULE_JSON_NO_PATTERN)
@@ -0,0 +1,121 @@
+"""Test src/waydroid_injector/validate.py."""
+
+import pytest
+from typing import Any
+from pathlib import PurePath
+from waydroid_injector.source import Source
+from waydroid_injector.content import Content
+from waydroid_injector.validate import PathTrie
+from waydroid_injector.validate import Validator
+from waydroid_injector.validate import validate
+
+
+class TestPathTrie:
+    """Test PathTrie class."""
+
+    def test_insert(self):
+        """Test PathTrie.insert function finds conflicts."""
+        trie = PathTrie()
+        assert trie.insert(PurePath("{overlay}/system"), 0, "directory") == []
+        assert trie.insert(PurePath("{overlay}/system/a"), 1, "file") == []
+        assert trie.insert(PurePath("{overlay}/system/a/b"), 2, "file")[0].fatal
+        assert not trie.insert(PurePath("{overlay}/system/a"), 3, "file")[0].fatal
+        assert trie.insert(PurePath("{overlay}/system"), 4, "link")[-1].fatal
+
+
+class TestValidator:
+    """Test Validator class."""
+
+    def test_add(self):
+        """Test Validator.add function finds problems of each content."""
+        validator = Validator("test", "", [])
+        assert [problem.message for problem in validator.problems] == [
+            "Manifest.version should not be empty.",
+        ]
+        a = Content.load({"path": "{overlay}/a", "type": "file", "content": "a"})
+        b = Content.load({"path": "{overlay}/a/b", "type": "file", "content": "b"})
+        assert validator.add(a) == []
+        assert [problem.message for problem in validator.add(b)] == [
+            "contents[1] is under file contents[0].",
+        ]
+        assert validator.finish() == []
+
+
+@pytest.mark.parametrize(
+    ("sources", "contents", "messages"),
+    [
+        (
+            [{"url": "https://example.com/a.zip"}],
+            [{"path": "{overlay}/a", "type": "file", "source": "{srcdir}/a.zip"}],
+            [],
+        ),
+        (
+            [{"url": "https://example.com/a.zip"}],
+            [{"path": "{overlay}/a", "type": "file", "source": "{srcdir}/b.zip"}],
+            ["contents[0] reads {srcdir}/b.zip which no source produces."],
+        ),
+        (
+            [{"url": "https://example.com/a.zip", "build": {"extract": True}}],
+            [{"path": "{overlay}/a", "type": "file", "source": "{srcdir}/b"}],
+            [],
+        ),
+        (
+            [
+                {
+                    "url": "https://example.com/a.zip",
+                    "build": {"extract": {"include": ["system/app/*"]}},
+                },
+            ],
+            [
+                {"path": "{overlay}/a", "type": "tree", "source": "{srcdir}/system"},
+                {"path": "{overlay}/b", "type": "file", "source": "{srcdir}/vendor/b"},
+            ],
+            ["contents[1] reads {srcdir}/vendor/b which no source produces."],
+        ),
+        (
+            [
+                {
+                    "url": "https://example.com/a.zip",
+                    "build": {"extract": {"include": ["system"]}, "cmd": ["make"]},
+                },
+            ],
+            [{"path": "{overlay}/b", "type": "file", "source": "{srcdir}/vendor/b"}],
+            [],
+        ),
+        (
+            [{"url": "https://example.com/a.zip"}, {"path": "/srv/a.zip"}],
+            [{"path": "{overlay}/a", "type": "directory"}],
+            ["sources[0] and sources[1] are both saved as a.zip."],
+        ),
+        (
+            [],
+            [
+                {"path": "{overlay}/a", "type": "link", "source": "b"},
+                {"path": "{overlay}/a/c", "type": "file", "content": "c"},
+                {"path": "{overlay}/{srcdir}", "type": "directory"},
+            ],
+            [
+                "contents[1] is under link contents[0].",
+                "contents[2] has an unknown variable 'srcdir'.",
+            ],
+        ),
+        (
+            [],
+            [],
+            ["Manifest.contents should not be empty."],
+        ),
+    ],
+)
+def test_validate(
+    sources: list[dict[str, Any]],
+    contents: list[dict[str, Any]],
+    messages: list[str],
+):
+    """Test validate function."""
+    problems = validate(
+        "test",
+        "1.0",
+        [Source.load(i) for i in sources],
+        [Content.load(i) for i in contents],
+    )
+    assert [problem.message for problem in problems] == messages
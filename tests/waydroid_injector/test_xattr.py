@@ -0,0 +1,35 @@
+"""Test src/waydroid_injector/xattr.py."""
+
+import pytest
+from os import setxattr
+from pathlib import Path
+from waydroid_injector.xattr import diff_xattrs
+from waydroid_injector.xattr import read_xattrs
+from waydroid_injector.xattr import apply_xattrs
+
+
+@pytest.fixture
+def path(tmp_path: Path) -> Path:
+    """Get a file supporting user xattrs.
+
+    Returns:
+        Path: The file.
+    """
+    p = tmp_path / "test"
+    p.touch()
+    try:
+        setxattr(p, "user.probe", b"")
+    except OSError:
+        pytest.skip("user xattrs are not supported.")
+    return p
+
+
+def test_apply_xattrs(path: Path):
+    """Test apply_xattrs function only writes differences."""
+    values = {"user.a": b"a", "user.b": b"b"}
+    assert apply_xattrs(path, values) == len(values)
+    assert apply_xattrs(path, values) == 0
+    values["user.a"] = b"changed"
+    assert diff_xattrs(path, values) == {"user.a": b"changed"}
+    assert apply_xattrs(path, values) == 1
+    assert read_xattrs(path) == {"user.probe": b"", **values}